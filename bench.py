@@ -0,0 +1,531 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from urllib.parse import urlencode, urlsplit
+from catalog_cli import import_records
+from repository import CoffeeRepository, id_selection
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+ORIGINS = [
+    ('Эфиопия', ['Иргачефф', 'Сидамо', 'Гуджи', 'Лимму', 'Харрар']),
+    ('Колумбия', ['Супремо', 'Уила', 'Нариньо', 'Каука', 'Толима']),
+    ('Бразилия', ['Сантос', 'Серрадо', 'Моджиана', 'Сул-де-Минас']),
+    ('Кения', ['АА', 'АВ', 'Ньери', 'Кириньяга']),
+    ('Гватемала', ['Антигуа', 'Уэуэтенанго', 'Атитлан']),
+    ('Коста-Рика', ['Тарразу', 'Западная долина']),
+    ('Гондурас', ['Марказала', 'Копан']),
+    ('Перу', ['Куско', 'Кахамарка']),
+    ('Руанда', ['Нгома', 'Ньямашеке']),
+    ('Индонезия', ['Суматра Мандхелинг', 'Ява', 'Сулавеси Тораджа']),
+]
+PROCESSES = ['мытая', 'натуральная', 'хани', 'анаэробная']
+NOTES = [
+    'цветочные ноты', 'бергамот', 'цитрус', 'ореховый', 'карамельный', 'шоколадный', 'пряный',
+    'дымный', 'ягодный', 'винный', 'томатный', 'ванильный', 'черника', 'персик', 'жасмин',
+    'молочный шоколад', 'табак', 'тростниковый сахар', 'абрикос', 'красное яблоко',
+]
+ROAST_DEGREES = ['Светлая', 'Средняя', 'Темная']
+GROUND_WHOLE = ['В зернах', 'Молотый']
+VOLUMES = [250, 500, 1000]
+SEARCHES = ['Эфиопия', 'Кения АА', 'шоколад', 'ягодный бергамот', 'суматра', 'ка', 'Колумбиа', 'Иргачеф шоколат']
+FILTERS = [(roast, ground) for roast in ['Все', *ROAST_DEGREES] for ground in ['Все', *GROUND_WHOLE]]
+REGRESSION_THRESHOLD = 0.2
+STARTUP_PROBE = '''
+import json, sys, time
+from PyQt6.QtCore import QEvent, QObject, QTimer
+from PyQt6.QtWidgets import QApplication
+import main
+
+marks = {'imported': time.time()}
+
+
+class Probe(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            marks.setdefault('first_paint', time.time())
+            model = getattr(window, 'coffee_model', None)
+            if model is not None and model.rowCount() and obj is window.coffeeTable.viewport():
+                marks.setdefault('first_page', time.time())
+                QTimer.singleShot(0, app.quit)
+        return False
+
+
+app = QApplication(sys.argv[:1])
+probe = Probe()
+app.installEventFilter(probe)
+window = main.CoffeeApp()
+window.show()
+app.exec()
+window.close()
+print(json.dumps(marks))
+'''
+
+
+def generate_records(count, seed=0):
+    rng = random.Random(seed)
+    for number in range(count):
+        origin, regions = rng.choice(ORIGINS)
+        yield number, {
+            'name': f'{origin} {rng.choice(regions)} {rng.choice(PROCESSES)} №{number}',
+            'roast_degree': rng.choice(ROAST_DEGREES),
+            'ground_whole': rng.choice(GROUND_WHOLE),
+            'taste_description': ', '.join(rng.sample(NOTES, 3)).capitalize(),
+            'price': round(rng.uniform(450, 3500), 2),
+            'volume': rng.choice(VOLUMES),
+        }
+
+
+def create_catalog(path, count, seed=0):
+    repository = CoffeeRepository(path)
+    import_records(repository, generate_records(count, seed), commit_every=10 ** 6)
+    repository.close()
+
+
+def catalog_path(count, seed, cache_dir):
+    path = os.path.join(cache_dir, f'catalog-{count}-{seed}.sqlite')
+    if not os.path.exists(path):
+        started = time.perf_counter()
+        create_catalog(path, count, seed)
+        print(f'generated {count} rows in {time.perf_counter() - started:.1f} s', file=sys.stderr)
+    return path
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        'p50': percentile(0.5),
+        'p95': percentile(0.95),
+        'p99': percentile(0.99),
+        'mean': statistics.fmean(ordered) * 1000,
+    }
+
+
+def max_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if sys.platform == 'darwin' else peak
+
+
+def measure(action, repeat):
+    rss_before = max_rss_kb()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        action()
+        samples.append(time.perf_counter() - started)
+    tracemalloc.start()
+    action()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    result = summarize(samples)
+    result['peak_kb'] = peak / 1024
+    result['rss_growth_kb'] = None if rss_before is None else max_rss_kb() - rss_before
+    return result
+
+
+def bench_catalog(args):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtWidgets import QApplication
+    import main
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    cache_dir = args.cache_dir or tempfile.mkdtemp(prefix='espresso-bench-')
+    os.makedirs(cache_dir, exist_ok=True)
+    results = {}
+    try:
+        for count in args.rows:
+            source = catalog_path(count, args.seed, cache_dir)
+            work_path = os.path.join(cache_dir, 'work.sqlite')
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(work_path + suffix):
+                    os.remove(work_path + suffix)
+            shutil.copyfile(source, work_path)
+            main.default_db_path = lambda: work_path
+            window = main.CoffeeApp()
+            window.show()
+
+            def settle():
+                while window.repository is None or window.pending_query is not None:
+                    app.processEvents()
+                app.processEvents()
+
+            def load():
+                window.load_coffee_data()
+                settle()
+
+            def apply_filters(search, roast, ground):
+                for widget in (window.searchInput, window.roastFilter, window.typeFilter):
+                    widget.blockSignals(True)
+                window.searchInput.setText(search)
+                window.roastFilter.setCurrentText(roast)
+                window.typeFilter.setCurrentText(ground)
+                for widget in (window.searchInput, window.roastFilter, window.typeFilter):
+                    widget.blockSignals(False)
+                window.filter_data()
+                settle()
+
+            settle()
+            scenarios = {'load_coffee_data': measure(load, args.repeat)}
+            for search in SEARCHES:
+                scenarios[f'search:{search}'] = measure(lambda: apply_filters(search, 'Все', 'Все'), args.repeat)
+            for roast, ground in FILTERS:
+                scenarios[f'filter:{roast}/{ground}'] = measure(lambda: apply_filters('', roast, ground), args.repeat)
+            apply_filters('', 'Все', 'Все')
+
+            rng = random.Random(args.seed)
+            counter = iter(range(10 ** 9))
+
+            def record():
+                _, data = next(generate_records(1, rng.randrange(10 ** 9)))
+                data['name'] = f'Замер {next(counter)} {data["name"]}'
+                return data
+
+            created = []
+
+            def add():
+                created.append(window.repository.add(record()))
+                window.apply_change(created[-1])
+
+            def edit():
+                coffee = created[rng.randrange(len(created))]
+                window.apply_change(window.repository.update(coffee.id, dict(record(), name=coffee.name)))
+
+            def delete():
+                coffee = created.pop()
+                window.repository.delete(coffee.id)
+                window.apply_change(deleted_id=coffee.id)
+
+            scenarios['add'] = measure(add, args.repeat)
+            scenarios['edit'] = measure(edit, args.repeat)
+            scenarios['delete'] = measure(delete, args.repeat)
+            window.close()
+            results[str(count)] = scenarios
+            report(count, scenarios, load_baseline(args.compare).get(str(count)) if args.compare else None)
+    finally:
+        if not args.cache_dir:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as file:
+            json.dump({'rows': results, 'created': time.strftime('%Y-%m-%d %H:%M:%S')}, file,
+                      ensure_ascii=False, indent=2)
+    if args.compare:
+        return 1 if find_regressions(results, load_baseline(args.compare)) else 0
+    return 0
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)['rows']
+
+
+def find_regressions(results, baseline):
+    regressions = []
+    for count, scenarios in results.items():
+        for name, result in scenarios.items():
+            previous = baseline.get(count, {}).get(name)
+            if previous and result['p50'] > previous['p50'] * (1 + REGRESSION_THRESHOLD):
+                regressions.append((count, name))
+    return regressions
+
+
+def report(count, scenarios, baseline=None):
+    print(f'{count} rows')
+    print(f'  {"scenario":<32} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"py KB":>9} {"RSS+ KB":>9}')
+    for name, result in scenarios.items():
+        rss = result.get('rss_growth_kb')
+        line = (f'  {name:<32} {result["p50"]:>9.2f} {result["p95"]:>9.2f} {result["p99"]:>9.2f} '
+                f'{result["peak_kb"]:>9.0f} {"—" if rss is None else f"{rss:.0f}":>9}')
+        previous = (baseline or {}).get(name)
+        if previous:
+            change = (result['p50'] - previous['p50']) / previous['p50'] * 100 if previous['p50'] else 0
+            marker = '  REGRESSION' if change > REGRESSION_THRESHOLD * 100 else ''
+            line += f'  {change:+6.1f}%{marker}'
+        print(line)
+
+
+def bench_startup(args):
+    cache_dir = args.cache_dir or tempfile.mkdtemp(prefix='espresso-bench-')
+    os.makedirs(cache_dir, exist_ok=True)
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    command = [sys.executable, *(['-OO'] if args.optimize else []), '-c', STARTUP_PROBE]
+    try:
+        for count in args.rows:
+            env['ESPRESSO_DB'] = catalog_path(count, args.seed, cache_dir)
+            samples = {'imported': [], 'first_paint': [], 'first_page': []}
+            for _ in range(args.repeat):
+                started = time.time()
+                output = subprocess.run(command, env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                        capture_output=True, text=True, check=True).stdout
+                marks = json.loads(output.strip().splitlines()[-1])
+                for name in samples:
+                    samples[name].append(marks[name] - started)
+            print(f'{count} rows')
+            print(f'  {"milestone":<32} {"p50 ms":>9} {"p95 ms":>9} {"mean ms":>9}')
+            for name, values in samples.items():
+                result = summarize(values)
+                print(f'  {name:<32} {result["p50"]:>9.2f} {result["p95"]:>9.2f} {result["mean"]:>9.2f}')
+    finally:
+        if not args.cache_dir:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+    return 0
+
+
+async def http_request(reader, writer, method, path, payload=None, headers=()):
+    body = json.dumps(payload, ensure_ascii=False).encode() if payload is not None else b''
+    lines = [f'{method} {path} HTTP/1.1', 'Host: localhost', f'Content-Length: {len(body)}', *headers]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    etag = None
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+        elif name.lower() == 'etag':
+            etag = value.strip()
+    if length:
+        await reader.readexactly(length)
+    return status, etag
+
+
+async def load_clients(host, port, clients, requests, next_request):
+    latencies = []
+
+    async def client(number):
+        reader, writer = await asyncio.open_connection(host, port)
+        etags = {}
+        rng = random.Random(number)
+        for _ in range(requests):
+            method, path, payload, conditional = next_request(rng)
+            headers = [f'If-None-Match: {etags[path]}'] if conditional and path in etags else []
+            started = time.perf_counter()
+            status, etag = await http_request(reader, writer, method, path, payload, headers)
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                raise RuntimeError(f'{method} {path}: {status}')
+            if etag:
+                etags[path] = etag
+        writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(clients)))
+    return len(latencies) / (time.perf_counter() - started), summarize(latencies)
+
+
+def bench_server(args):
+    cache_dir = args.cache_dir or tempfile.mkdtemp(prefix='espresso-bench-')
+    os.makedirs(cache_dir, exist_ok=True)
+    paths = []
+    for search in ['', *SEARCHES]:
+        for roast, ground in FILTERS:
+            filters = {name: value for name, value in (('search', search), ('roast', roast), ('type', ground))
+                       if value and value != 'Все'}
+            paths += [f'/coffee?{urlencode(dict(filters, sort=sort))}' for sort in ('name', 'price')]
+    counter = iter(range(10 ** 9))
+
+    def read(rng):
+        return 'GET', rng.choice(paths), None, False
+
+    def revalidate(rng):
+        return 'GET', rng.choice(paths), None, True
+
+    def mixed(rng):
+        if rng.random() >= args.write_ratio:
+            return read(rng)
+        records = [dict(data, name=f'Нагрузка {next(counter)} {data["name"]}')
+                   for _, data in generate_records(args.batch, rng.randrange(10 ** 9))]
+        return 'POST', '/coffee/batch', {'add': records}, False
+
+    try:
+        for count in args.rows:
+            work_path = os.path.join(cache_dir, 'server.sqlite')
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(work_path + suffix):
+                    os.remove(work_path + suffix)
+            shutil.copyfile(catalog_path(count, args.seed, cache_dir), work_path)
+            server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server.py'),
+                                       '--db', work_path, '--port', '0', '--readers', str(args.readers)],
+                                      stdout=subprocess.PIPE, text=True)
+            try:
+                address = urlsplit(server.stdout.readline().split()[-1])
+                print(f'{count} rows, {args.clients} clients x {args.requests} requests')
+                print(f'  {"scenario":<32} {"req/s":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}')
+                for name, next_request in (('read', read), ('revalidate', revalidate), ('mixed', mixed)):
+                    rate, result = asyncio.run(load_clients(address.hostname, address.port, args.clients,
+                                                            args.requests, next_request))
+                    print(f'  {name:<32} {rate:>9.0f} {result["p50"]:>9.2f} {result["p95"]:>9.2f} {result["p99"]:>9.2f}')
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        if not args.cache_dir:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+    return 0
+
+
+def bench_summary(args):
+    cache_dir = args.cache_dir or tempfile.mkdtemp(prefix='espresso-bench-')
+    os.makedirs(cache_dir, exist_ok=True)
+    failed = False
+    try:
+        for count in args.rows:
+            work_path = os.path.join(cache_dir, 'summary.sqlite')
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(work_path + suffix):
+                    os.remove(work_path + suffix)
+            shutil.copyfile(catalog_path(count, args.seed, cache_dir), work_path)
+            repository = CoffeeRepository(work_path)
+            rng = random.Random(args.seed)
+            counter = iter(range(10 ** 9))
+            scenarios = {}
+            for roast, ground in FILTERS:
+                label = f'{roast}/{ground}'
+                base = repository.filter_query('', roast, ground)[:2]
+                scenarios[f'group by {label}'] = measure(
+                    lambda: repository.fetch(*repository.grouped_summary_query(*base)), args.repeat)
+                scenarios[f'summary {label}'] = measure(
+                    lambda: repository.fetch(*repository.summary_query(roast, ground)), args.repeat)
+
+            def record():
+                _, data = next(generate_records(1, rng.randrange(10 ** 9)))
+                data['name'] = f'Сводка {next(counter)} {data["name"]}'
+                return data
+
+            def random_ids(size):
+                return [row[0] for row in repository.fetch(
+                    'SELECT id FROM coffee WHERE id >= ? ORDER BY id LIMIT ?', (rng.randrange(count), size))]
+
+            def write():
+                action = rng.randrange(5)
+                if action == 0:
+                    repository.add(record())
+                elif action == 1:
+                    coffee_id = random_ids(1)[0]
+                    repository.update(coffee_id, dict(record(), name=repository.get(coffee_id).name))
+                elif action == 2:
+                    repository.delete_many(random_ids(rng.randint(1, 5)))
+                elif action == 3:
+                    repository.bulk_update(*id_selection(random_ids(args.batch)),
+                                           roast_degree=rng.choice(ROAST_DEGREES), price_factor=rng.uniform(0.5, 1.5))
+                else:
+                    repository.bulk_update(*id_selection(random_ids(args.batch)),
+                                           ground_whole=rng.choice(GROUND_WHOLE), price_delta=rng.uniform(-500, 500))
+
+            scenarios['random write'] = measure(write, args.writes)
+            mismatches = repository.check_summary()
+            repository.close()
+            report(count, scenarios)
+            for category, stored, expected in mismatches:
+                print(f'  MISMATCH {category}: summary {tuple(stored or ())}, expected {tuple(expected or ())}')
+            print(f'  summary check after {args.writes + 1} writes: {"FAILED" if mismatches else "ok"}')
+            failed = failed or bool(mismatches)
+    finally:
+        if not args.cache_dir:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+    return 1 if failed else 0
+
+
+def bench_generate(args):
+    started = time.perf_counter()
+    create_catalog(args.db, args.rows, args.seed)
+    print(f'generated {args.rows} rows in {time.perf_counter() - started:.1f} s')
+
+
+def bench_import(args):
+    for count in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            repository = CoffeeRepository(os.path.join(tmp, 'coffee.sqlite'))
+            records = list(generate_records(count, args.seed))
+            started = time.perf_counter()
+            imported, _ = import_records(repository, records, args.batch_size)
+            elapsed = time.perf_counter() - started
+            started = time.perf_counter()
+            upserted, _ = import_records(repository, records, args.batch_size)
+            upsert_elapsed = time.perf_counter() - started
+            repository.close()
+        print(f'import {count:>9} rows: insert {imported / elapsed:>10.0f} rows/s ({elapsed:.2f} s), '
+              f'upsert {upserted / upsert_elapsed:>10.0f} rows/s ({upsert_elapsed:.2f} s)')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Замеры производительности кофейной карты")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help="скорость пакетного импорта")
+    import_parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    import_parser.add_argument('--batch-size', type=int, default=5000)
+    import_parser.add_argument('--seed', type=int, default=0)
+    import_parser.set_defaults(handler=bench_import)
+
+    catalog_parser = commands.add_parser('catalog', help="загрузка, фильтры и запись через окно приложения")
+    catalog_parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    catalog_parser.add_argument('--repeat', type=int, default=20)
+    catalog_parser.add_argument('--seed', type=int, default=0)
+    catalog_parser.add_argument('--cache-dir', help="каталог для повторного использования сгенерированных баз")
+    catalog_parser.add_argument('--save', help="сохранить результаты как базовую линию (JSON)")
+    catalog_parser.add_argument('--compare', help="сравнить с сохранённой базовой линией")
+    catalog_parser.set_defaults(handler=bench_catalog)
+
+    startup_parser = commands.add_parser('startup', help="время до первой отрисовки и первой страницы")
+    startup_parser.add_argument('--rows', type=int, nargs='+', default=[1000, 100000])
+    startup_parser.add_argument('--repeat', type=int, default=10)
+    startup_parser.add_argument('--seed', type=int, default=0)
+    startup_parser.add_argument('--optimize', action='store_true', help="запускать с -OO, как сборка optimize=2")
+    startup_parser.add_argument('--cache-dir', help="каталог для повторного использования сгенерированных баз")
+    startup_parser.set_defaults(handler=bench_startup)
+
+    server_parser = commands.add_parser('server', help="нагрузочный тест HTTP-сервера на loopback")
+    server_parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    server_parser.add_argument('--clients', type=int, default=16)
+    server_parser.add_argument('--requests', type=int, default=500, help="запросов на клиента")
+    server_parser.add_argument('--readers', type=int, default=4)
+    server_parser.add_argument('--write-ratio', type=float, default=0.05, help="доля пакетных записей в смешанном сценарии")
+    server_parser.add_argument('--batch', type=int, default=10, help="строк в одной пакетной записи")
+    server_parser.add_argument('--seed', type=int, default=0)
+    server_parser.add_argument('--cache-dir', help="каталог для повторного использования сгенерированных баз")
+    server_parser.set_defaults(handler=bench_server)
+
+    summary_parser = commands.add_parser('summary', help="сводка цен: GROUP BY против таблицы сводки, сверка после записей")
+    summary_parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    summary_parser.add_argument('--repeat', type=int, default=20)
+    summary_parser.add_argument('--writes', type=int, default=500, help="случайных записей перед сверкой")
+    summary_parser.add_argument('--batch', type=int, default=50, help="строк в одном массовом изменении")
+    summary_parser.add_argument('--seed', type=int, default=0)
+    summary_parser.add_argument('--cache-dir', help="каталог для повторного использования сгенерированных баз")
+    summary_parser.set_defaults(handler=bench_summary)
+
+    generate_parser = commands.add_parser('generate', help="создать синтетический каталог")
+    generate_parser.add_argument('db')
+    generate_parser.add_argument('--rows', type=int, default=100000)
+    generate_parser.add_argument('--seed', type=int, default=0)
+    generate_parser.set_defaults(handler=bench_generate)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# Form implementation generated from reading ui file 'UI/bulkEditForm.ui'
+#
+# Created by: PyQt6 UI code generator 6.9.1
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic6 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt6 import QtCore, QtGui, QtWidgets
+
+
+class BulkDesign(object):
+    def setupUi(self, Dialog):
+        Dialog.setObjectName("Dialog")
+        Dialog.resize(420, 300)
+        self.verticalLayout = QtWidgets.QVBoxLayout(Dialog)
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.scopeGroup = QtWidgets.QGroupBox(parent=Dialog)
+        self.scopeGroup.setObjectName("scopeGroup")
+        self.scopeLayout = QtWidgets.QVBoxLayout(self.scopeGroup)
+        self.scopeLayout.setObjectName("scopeLayout")
+        self.selectionRadio = QtWidgets.QRadioButton(parent=self.scopeGroup)
+        self.selectionRadio.setChecked(True)
+        self.selectionRadio.setObjectName("selectionRadio")
+        self.scopeLayout.addWidget(self.selectionRadio)
+        self.filterRadio = QtWidgets.QRadioButton(parent=self.scopeGroup)
+        self.filterRadio.setObjectName("filterRadio")
+        self.scopeLayout.addWidget(self.filterRadio)
+        self.verticalLayout.addWidget(self.scopeGroup)
+        self.formLayout = QtWidgets.QFormLayout()
+        self.formLayout.setObjectName("formLayout")
+        self.label = QtWidgets.QLabel(parent=Dialog)
+        self.label.setObjectName("label")
+        self.formLayout.setWidget(0, QtWidgets.QFormLayout.ItemRole.LabelRole, self.label)
+        self.roastCombo = QtWidgets.QComboBox(parent=Dialog)
+        self.roastCombo.setObjectName("roastCombo")
+        self.roastCombo.addItem("")
+        self.roastCombo.addItem("")
+        self.roastCombo.addItem("")
+        self.roastCombo.addItem("")
+        self.formLayout.setWidget(0, QtWidgets.QFormLayout.ItemRole.FieldRole, self.roastCombo)
+        self.label_2 = QtWidgets.QLabel(parent=Dialog)
+        self.label_2.setObjectName("label_2")
+        self.formLayout.setWidget(1, QtWidgets.QFormLayout.ItemRole.LabelRole, self.label_2)
+        self.typeCombo = QtWidgets.QComboBox(parent=Dialog)
+        self.typeCombo.setObjectName("typeCombo")
+        self.typeCombo.addItem("")
+        self.typeCombo.addItem("")
+        self.typeCombo.addItem("")
+        self.formLayout.setWidget(1, QtWidgets.QFormLayout.ItemRole.FieldRole, self.typeCombo)
+        self.label_3 = QtWidgets.QLabel(parent=Dialog)
+        self.label_3.setObjectName("label_3")
+        self.formLayout.setWidget(2, QtWidgets.QFormLayout.ItemRole.LabelRole, self.label_3)
+        self.priceModeCombo = QtWidgets.QComboBox(parent=Dialog)
+        self.priceModeCombo.setObjectName("priceModeCombo")
+        self.priceModeCombo.addItem("")
+        self.priceModeCombo.addItem("")
+        self.priceModeCombo.addItem("")
+        self.formLayout.setWidget(2, QtWidgets.QFormLayout.ItemRole.FieldRole, self.priceModeCombo)
+        self.label_4 = QtWidgets.QLabel(parent=Dialog)
+        self.label_4.setObjectName("label_4")
+        self.formLayout.setWidget(3, QtWidgets.QFormLayout.ItemRole.LabelRole, self.label_4)
+        self.priceSpin = QtWidgets.QDoubleSpinBox(parent=Dialog)
+        self.priceSpin.setMinimum(-10000.0)
+        self.priceSpin.setMaximum(10000.0)
+        self.priceSpin.setObjectName("priceSpin")
+        self.formLayout.setWidget(3, QtWidgets.QFormLayout.ItemRole.FieldRole, self.priceSpin)
+        self.verticalLayout.addLayout(self.formLayout)
+        self.buttonBox = QtWidgets.QDialogButtonBox(parent=Dialog)
+        self.buttonBox.setOrientation(QtCore.Qt.Orientation.Horizontal)
+        self.buttonBox.setStandardButtons(QtWidgets.QDialogButtonBox.StandardButton.Cancel|QtWidgets.QDialogButtonBox.StandardButton.Ok)
+        self.buttonBox.setObjectName("buttonBox")
+        self.verticalLayout.addWidget(self.buttonBox)
+
+        self.retranslateUi(Dialog)
+        QtCore.QMetaObject.connectSlotsByName(Dialog)
+
+    def retranslateUi(self, Dialog):
+        _translate = QtCore.QCoreApplication.translate
+        Dialog.setWindowTitle(_translate("Dialog", "Массовое изменение"))
+        self.scopeGroup.setTitle(_translate("Dialog", "Применить к"))
+        self.selectionRadio.setText(_translate("Dialog", "Выделенным строкам"))
+        self.filterRadio.setText(_translate("Dialog", "Всем строкам текущего фильтра"))
+        self.label.setText(_translate("Dialog", "Степень обжарки:"))
+        self.roastCombo.setItemText(0, _translate("Dialog", "Не менять"))
+        self.roastCombo.setItemText(1, _translate("Dialog", "Светлая"))
+        self.roastCombo.setItemText(2, _translate("Dialog", "Средняя"))
+        self.roastCombo.setItemText(3, _translate("Dialog", "Темная"))
+        self.label_2.setText(_translate("Dialog", "Тип:"))
+        self.typeCombo.setItemText(0, _translate("Dialog", "Не менять"))
+        self.typeCombo.setItemText(1, _translate("Dialog", "В зернах"))
+        self.typeCombo.setItemText(2, _translate("Dialog", "Молотый"))
+        self.label_3.setText(_translate("Dialog", "Цена:"))
+        self.priceModeCombo.setItemText(0, _translate("Dialog", "Не менять"))
+        self.priceModeCombo.setItemText(1, _translate("Dialog", "Изменить на, %"))
+        self.priceModeCombo.setItemText(2, _translate("Dialog", "Изменить на, ₽"))
+        self.label_4.setText(_translate("Dialog", "Величина:"))
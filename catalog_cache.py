@@ -0,0 +1,249 @@
+import bisect
+from array import array
+from repository import ALL, SELECT_COLUMNS, search_words
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Vocabulary:
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def ranks(self):
+        ranks = [0] * len(self.values)
+        for rank, code in enumerate(sorted(range(len(self.values)), key=self.values.__getitem__)):
+            ranks[code] = rank
+        return ranks
+
+
+def search_text(name, taste_description):
+    return ' ' + ' '.join(search_words(f'{name} {taste_description or ""}'))
+
+
+class CatalogCache:
+    CHUNK_SIZE = 10000
+    FULL_RELOAD_RATIO = 0.25
+
+    def __init__(self, repository):
+        self.repository = repository
+        self.conn = repository.acquire_reader()
+        self.version = 0
+        self.reload()
+
+    def reload(self):
+        self.ids = array('q')
+        self.names = []
+        self.roast_codes = array('H')
+        self.ground_codes = array('H')
+        self.tastes = []
+        self.prices = array('d')
+        self.volumes = array('d')
+        self.search_texts = []
+        self.alive = bytearray()
+        self.slots = {}
+        self.deleted = 0
+        self.roasts = Vocabulary()
+        self.grounds = Vocabulary()
+        self._orders = {}
+        self._result = None
+        self.data_version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+        self.conn.execute('BEGIN')
+        try:
+            self.seq = self.conn.execute('SELECT IFNULL(MAX(seq), 0) FROM coffee_changes').fetchone()[0]
+            cursor = self.conn.execute(f'SELECT {SELECT_COLUMNS} FROM coffee ORDER BY id')
+            for rows in iter(lambda: cursor.fetchmany(self.CHUNK_SIZE), []):
+                for row in rows:
+                    self._append(row)
+        finally:
+            self.conn.rollback()
+        self.version += 1
+
+    def refresh(self):
+        data_version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+        if data_version == self.data_version:
+            return False
+        self.data_version = data_version
+        changes = self.repository.execute(
+            self.conn, 'SELECT seq, coffee_id FROM coffee_changes WHERE seq > ? ORDER BY seq', (self.seq,))
+        if not changes:
+            return False
+        if len(changes) > self.FULL_RELOAD_RATIO * len(self.slots):
+            self.reload()
+            return True
+        self.seq = changes[-1][0]
+        changed = list(dict.fromkeys(coffee_id for _, coffee_id in changes))
+        rows = {}
+        for start in range(0, len(changed), 500):
+            chunk = changed[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            for row in self.repository.execute(
+                    self.conn, f'SELECT {SELECT_COLUMNS} FROM coffee WHERE id IN ({placeholders})', chunk):
+                rows[row[0]] = row
+        for coffee_id in changed:
+            self._patch(coffee_id, rows.get(coffee_id))
+        self.version += 1
+        self._result = None
+        if self.deleted > self.FULL_RELOAD_RATIO * len(self.ids):
+            self.reload()
+        return True
+
+    def _append(self, row):
+        coffee_id, name, roast_degree, ground_whole, taste_description, price, volume = row
+        slot = len(self.ids)
+        self.slots[coffee_id] = slot
+        self.ids.append(coffee_id)
+        self.names.append(name)
+        self.roast_codes.append(self.roasts.code(roast_degree))
+        self.ground_codes.append(self.grounds.code(ground_whole))
+        self.tastes.append(taste_description)
+        self.prices.append(price)
+        self.volumes.append(volume)
+        self.search_texts.append(search_text(name, taste_description))
+        self.alive.append(1)
+        return slot
+
+    def _patch(self, coffee_id, row):
+        slot = self.slots.get(coffee_id)
+        if slot is not None:
+            for column, order in self._orders.items():
+                del order[bisect.bisect_left(order, self._key(column)(slot), key=self._key(column))]
+            if row is None:
+                del self.slots[coffee_id]
+                self.alive[slot] = 0
+                self.deleted += 1
+                return
+            _, name, roast_degree, ground_whole, taste_description, price, volume = row
+            self.names[slot] = name
+            self.roast_codes[slot] = self.roasts.code(roast_degree)
+            self.ground_codes[slot] = self.grounds.code(ground_whole)
+            self.tastes[slot] = taste_description
+            self.prices[slot] = price
+            self.volumes[slot] = volume
+            self.search_texts[slot] = search_text(name, taste_description)
+        elif row is None:
+            return
+        else:
+            slot = self._append(row)
+        for column, order in self._orders.items():
+            bisect.insort(order, slot, key=self._key(column))
+
+    def _key(self, column):
+        ids = self.ids
+        if column == 0:
+            return lambda slot: (ids[slot], ids[slot])
+        if column == 1:
+            values = self.names
+        elif column == 2:
+            values, codes = self.roasts.values, self.roast_codes
+            return lambda slot: (values[codes[slot]], ids[slot])
+        elif column == 3:
+            values, codes = self.grounds.values, self.ground_codes
+            return lambda slot: (values[codes[slot]], ids[slot])
+        elif column == 4:
+            tastes = self.tastes
+            return lambda slot: (tastes[slot] or '', ids[slot])
+        else:
+            values = self.prices if column == 5 else self.volumes
+        return lambda slot: (values[slot], ids[slot])
+
+    def _order(self, column):
+        order = self._orders.get(column)
+        if order is not None:
+            return order
+        if numpy is not None and column in (0, 2, 3, 5, 6):
+            ids = numpy.frombuffer(self.ids, dtype=numpy.int64)
+            if column == 0:
+                values = ids
+            elif column in (2, 3):
+                vocabulary, codes = (self.roasts, self.roast_codes) if column == 2 else (self.grounds, self.ground_codes)
+                values = numpy.array(vocabulary.ranks(), dtype=numpy.int64)[numpy.frombuffer(codes, dtype=numpy.uint16)]
+            else:
+                values = numpy.frombuffer(self.prices if column == 5 else self.volumes, dtype=numpy.float64)
+            slots = numpy.lexsort((ids, values))
+            slots = slots[numpy.frombuffer(self.alive, dtype=numpy.uint8)[slots] == 1]
+            order = array('q', slots.astype(numpy.int64).tobytes())
+        else:
+            order = array('q', sorted(self.slots.values(), key=self._key(column)))
+        self._orders[column] = order
+        return order
+
+    def _select(self, column, words, roast_degree, ground_whole):
+        order = self._order(column)
+        roast_code = None if roast_degree == ALL else self.roasts.codes.get(roast_degree, -1)
+        ground_code = None if ground_whole == ALL else self.grounds.codes.get(ground_whole, -1)
+        if roast_code is None and ground_code is None:
+            slots = order
+        elif numpy is not None:
+            slots = numpy.frombuffer(order, dtype=numpy.int64)
+            mask = numpy.ones(len(slots), dtype=bool)
+            if roast_code is not None:
+                mask &= numpy.frombuffer(self.roast_codes, dtype=numpy.uint16)[slots] == roast_code
+            if ground_code is not None:
+                mask &= numpy.frombuffer(self.ground_codes, dtype=numpy.uint16)[slots] == ground_code
+            slots = array('q', slots[mask].tobytes())
+        else:
+            roast_codes, ground_codes = self.roast_codes, self.ground_codes
+            slots = array('q', [slot for slot in order
+                                if (roast_code is None or roast_codes[slot] == roast_code)
+                                and (ground_code is None or ground_codes[slot] == ground_code)])
+        if words:
+            texts = self.search_texts
+            needles = [' ' + word for word in words]
+            slots = array('q', [slot for slot in slots if all(needle in texts[slot] for needle in needles)])
+        return slots
+
+    def _matches(self, spec, slot):
+        words, roast_degree, ground_whole = spec
+        if roast_degree != ALL and self.roasts.values[self.roast_codes[slot]] != roast_degree:
+            return False
+        if ground_whole != ALL and self.grounds.values[self.ground_codes[slot]] != ground_whole:
+            return False
+        return all(' ' + word in self.search_texts[slot] for word in words)
+
+    def row(self, slot):
+        return (self.ids[slot], self.names[slot], self.roasts.values[self.roast_codes[slot]],
+                self.grounds.values[self.ground_codes[slot]], self.tastes[slot],
+                self.prices[slot], self.volumes[slot])
+
+    def filter_query(self, search_text='', roast_degree=ALL, ground_whole=ALL):
+        return (tuple(search_words(search_text)), roast_degree, ground_whole), [], False
+
+    def page_query(self, query, params, ranked, sort_column, descending, after, limit):
+        return (query, sort_column, descending, after, limit), params
+
+    def fetch(self, query, params):
+        spec, sort_column, descending, after, limit = query
+        self.refresh()
+        if self._result is None or self._result[0] != (spec, sort_column):
+            self._result = ((spec, sort_column), self._select(sort_column, *spec))
+        slots = self._result[1]
+        key = self._key(sort_column)
+        if descending:
+            end = len(slots) if after is None else bisect.bisect_left(slots, after, key=key)
+            return [self.row(slots[position]) for position in range(end - 1, max(end - limit, 0) - 1, -1)]
+        start = 0 if after is None else bisect.bisect_right(slots, after, key=key)
+        return [self.row(slot) for slot in slots[start:start + limit]]
+
+    def matches(self, query, params, coffee_id):
+        self.refresh()
+        slot = self.slots.get(coffee_id)
+        return slot is not None and self._matches(query, slot)
+
+    def matching_ids(self, query, params, ids):
+        self.refresh()
+        return {coffee_id for coffee_id in ids
+                if coffee_id in self.slots and self._matches(query, self.slots[coffee_id])}
+
+    def close(self):
+        self.repository.release_reader(self.conn)
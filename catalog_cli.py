@@ -0,0 +1,257 @@
+import argparse
+import csv
+import json
+import math
+import os
+import sqlite3
+import sys
+import time
+from catalog_sync import reset_node_id, sync
+from database import COLUMNS, default_db_path
+from repository import CoffeeRepository
+
+
+def detect_format(path, fmt):
+    if fmt:
+        return fmt
+    return 'jsonl' if path.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def read_csv(file):
+    reader = csv.DictReader(file)
+    for line_no, record in enumerate(reader, 2):
+        yield line_no, record
+
+
+def read_jsonl(file):
+    for line_no, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, e
+
+
+def to_row(record):
+    if isinstance(record, Exception):
+        raise ValueError(f"некорректный JSON: {record}")
+    if not isinstance(record, dict):
+        raise ValueError("ожидается объект")
+    for field in ('name', 'roast_degree', 'ground_whole', 'taste_description'):
+        if record.get(field) is not None and not isinstance(record[field], str):
+            raise ValueError(f"{field} должно быть строкой")
+    name = (record.get('name') or '').strip()
+    roast_degree = (record.get('roast_degree') or '').strip()
+    ground_whole = (record.get('ground_whole') or '').strip()
+    if not name or not roast_degree or not ground_whole:
+        raise ValueError("не заполнены name, roast_degree или ground_whole")
+    try:
+        price = float(record.get('price'))
+        volume = float(record.get('volume'))
+    except (TypeError, ValueError):
+        raise ValueError("price и volume должны быть числами")
+    if not math.isfinite(price) or not math.isfinite(volume):
+        raise ValueError("price и volume должны быть конечными числами")
+    return name, roast_degree, ground_whole, record.get('taste_description') or '', price, volume
+
+
+def import_records(repository, records, batch_size=5000, commit_every=100000, on_error=None, on_progress=None):
+    conn = repository.conn
+    imported = 0
+    failed = 0
+    uncommitted = 0
+    batch = []
+    cursor = conn.cursor()
+    cursor.execute('BEGIN')
+    try:
+        for line_no, record in records:
+            try:
+                batch.append(to_row(record))
+            except ValueError as e:
+                failed += 1
+                if on_error:
+                    on_error(line_no, record, str(e))
+                continue
+            if len(batch) >= batch_size:
+                repository.upsert_many(cursor, batch)
+                imported += len(batch)
+                uncommitted += len(batch)
+                batch = []
+                if uncommitted >= commit_every:
+                    conn.commit()
+                    cursor.execute('BEGIN')
+                    uncommitted = 0
+                if on_progress:
+                    on_progress(imported, failed)
+        if batch:
+            repository.upsert_many(cursor, batch)
+            imported += len(batch)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return imported, failed
+
+
+def export_records(repository, file, fmt, chunk_size=5000):
+    if fmt == 'csv':
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+    exported = 0
+    with repository.reader() as conn:
+        cursor = conn.execute(f'SELECT {", ".join(COLUMNS)} FROM coffee ORDER BY id')
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            if fmt == 'csv':
+                writer.writerows(rows)
+            else:
+                file.writelines(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + '\n' for row in rows)
+            exported += len(rows)
+    return exported
+
+
+def open_output(path):
+    if path == '-':
+        return sys.stdout
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def run_import(args):
+    fmt = detect_format(args.file, args.format)
+    repository = CoffeeRepository(args.db)
+    errors_file = open_output(args.errors) if args.errors else None
+    errors_writer = csv.writer(errors_file) if errors_file else None
+    if errors_writer:
+        errors_writer.writerow(('line', 'error', 'record'))
+    started = time.perf_counter()
+
+    def on_error(line_no, record, message):
+        if errors_writer:
+            errors_writer.writerow((line_no, message, record if isinstance(record, Exception) else json.dumps(record, ensure_ascii=False)))
+        elif not args.quiet:
+            print(f"Строка {line_no}: {message}", file=sys.stderr)
+
+    def on_progress(imported, failed):
+        if not args.quiet:
+            elapsed = time.perf_counter() - started
+            print(f"Импортировано {imported} строк, ошибок {failed} ({imported / elapsed:.0f} строк/с)", file=sys.stderr)
+
+    try:
+        with open(args.file, encoding='utf-8-sig', newline='') as file:
+            records = read_jsonl(file) if fmt == 'jsonl' else read_csv(file)
+            imported, failed = import_records(repository, records, args.batch_size, args.commit_every,
+                                              on_error, on_progress)
+    finally:
+        if errors_file and errors_file is not sys.stdout:
+            errors_file.close()
+        repository.close()
+    elapsed = time.perf_counter() - started
+    print(f"Готово: импортировано {imported} строк, ошибок {failed} за {elapsed:.2f} с", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def run_export(args):
+    fmt = detect_format(args.file, args.format)
+    repository = CoffeeRepository(args.db)
+    file = open_output(args.file)
+    try:
+        exported = export_records(repository, file, fmt)
+    finally:
+        if file is not sys.stdout:
+            file.close()
+        repository.close()
+    print(f"Готово: экспортировано {exported} строк", file=sys.stderr)
+    return 0
+
+
+def run_sync(args):
+    if not os.path.exists(args.peer):
+        print(f"Ошибка: база {args.peer} не найдена", file=sys.stderr)
+        return 1
+    local = peer = None
+    started = time.perf_counter()
+    try:
+        local = CoffeeRepository(args.db)
+        peer = CoffeeRepository(args.peer)
+        if args.new_node_id:
+            reset_node_id(local.conn)
+        received, sent = sync(local, peer)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if peer is not None:
+            peer.close()
+        if local is not None:
+            local.close()
+    elapsed = time.perf_counter() - started
+    for title, result in (("Получено", received), ("Отправлено", sent)):
+        print(f"{title}: изменений {result.received}, применено {result.applied}, "
+              f"конфликтов {result.conflicts}", file=sys.stderr)
+    print(f"Готово за {elapsed:.2f} с", file=sys.stderr)
+    return 0
+
+
+def run_check_summary(args):
+    repository = CoffeeRepository(args.db)
+    try:
+        mismatches = repository.check_summary()
+        for category, stored, expected in mismatches:
+            print(f"{' / '.join(category)}: в сводке {tuple(stored or ())}, "
+                  f"по таблице {tuple(expected or ())}", file=sys.stderr)
+        if mismatches and args.rebuild:
+            repository.rebuild_summary()
+    finally:
+        repository.close()
+    if not mismatches:
+        print("Сводка совпадает с таблицей", file=sys.stderr)
+        return 0
+    print(f"Расхождений: {len(mismatches)}" + (", сводка пересчитана" if args.rebuild else ""), file=sys.stderr)
+    return 0 if args.rebuild else 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Импорт и экспорт кофейной карты без графического интерфейса")
+    parser.add_argument('--db', default=None, help="путь к базе данных (по умолчанию data/coffee.sqlite)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help="загрузить CSV или JSONL")
+    import_parser.add_argument('file')
+    import_parser.add_argument('--format', choices=('csv', 'jsonl'))
+    import_parser.add_argument('--batch-size', type=int, default=5000)
+    import_parser.add_argument('--commit-every', type=int, default=100000)
+    import_parser.add_argument('--errors', help="CSV-файл для строк с ошибками")
+    import_parser.add_argument('--quiet', action='store_true')
+    import_parser.set_defaults(handler=run_import)
+
+    export_parser = commands.add_parser('export', help="выгрузить каталог в CSV или JSONL ('-' для stdout)")
+    export_parser.add_argument('file')
+    export_parser.add_argument('--format', choices=('csv', 'jsonl'))
+    export_parser.set_defaults(handler=run_export)
+
+    sync_parser = commands.add_parser('sync', help="обменяться изменениями с другой базой")
+    sync_parser.add_argument('peer', help="путь к базе другой кассы")
+    sync_parser.add_argument('--new-node-id', action='store_true',
+                             help="выдать этой базе новый идентификатор (если она скопирована с другой)")
+    sync_parser.set_defaults(handler=run_sync)
+
+    summary_parser = commands.add_parser('check-summary', help="сверить сводку цен с пересчетом по таблице")
+    summary_parser.add_argument('--rebuild', action='store_true', help="пересчитать сводку при расхождениях")
+    summary_parser.set_defaults(handler=run_check_summary)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db is None:
+        args.db = default_db_path()
+    elif os.path.dirname(args.db):
+        os.makedirs(os.path.dirname(args.db), exist_ok=True)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+from collections import namedtuple
+from database import COLUMNS
+
+Change = namedtuple('Change', 'name changed_at origin row')
+SyncResult = namedtuple('SyncResult', 'received applied conflicts last_seq')
+
+
+def node_id(conn):
+    return conn.execute("SELECT value FROM sync_state WHERE key = 'node_id'").fetchone()[0]
+
+
+def reset_node_id(conn):
+    with conn:
+        old = node_id(conn)
+        conn.execute("UPDATE sync_state SET value = lower(hex(randomblob(16))) WHERE key = 'node_id'")
+        new = node_id(conn)
+        conn.execute('UPDATE coffee_changes SET origin = ? WHERE origin = ?', (new, old))
+        conn.execute('DELETE FROM sync_peers')
+    return new
+
+
+def last_seen(conn, peer_id):
+    row = conn.execute('SELECT last_seq FROM sync_peers WHERE peer_id = ?', (peer_id,)).fetchone()
+    return row[0] if row else 0
+
+
+def read_changes(conn, after_seq, exclude_origin, chunk_size=500):
+    conn.execute('BEGIN')
+    try:
+        last_seq = conn.execute('SELECT IFNULL(MAX(seq), 0) FROM coffee_changes').fetchone()[0]
+        latest = {}
+        for name, old_name, origin, changed_at in conn.execute('''
+            SELECT name, old_name, origin, changed_at FROM coffee_changes
+            WHERE seq > ? AND seq <= ? AND name IS NOT NULL AND origin IS NOT ?
+            ORDER BY seq
+        ''', (after_seq, last_seq, exclude_origin)):
+            for touched in (name, old_name):
+                if touched is not None and (touched not in latest or latest[touched] < (changed_at, origin)):
+                    latest[touched] = (changed_at, origin)
+        names = list(latest)
+        rows = {}
+        for start in range(0, len(names), chunk_size):
+            chunk = names[start:start + chunk_size]
+            for row in conn.execute(f'SELECT {", ".join(COLUMNS)} FROM coffee '
+                                    f'WHERE name IN ({", ".join("?" * len(chunk))})', chunk):
+                rows[row[0]] = row
+    finally:
+        conn.rollback()
+    return last_seq, [Change(name, *latest[name], rows.get(name)) for name in names]
+
+
+def latest_local(cursor, name):
+    latest = None
+    for column in ('name', 'old_name'):
+        row = cursor.execute(f'SELECT changed_at, origin FROM coffee_changes WHERE {column} = ? '
+                             f'ORDER BY changed_at DESC LIMIT 1', (name,)).fetchone()
+        if row is not None and (latest is None or row > latest):
+            latest = row
+    return latest
+
+
+def apply_changes(repository, peer_id, changes, last_seq):
+    conn = repository.conn
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    applied = conflicts = 0
+    try:
+        cursor.execute('DELETE FROM sync_context')
+        cursor.execute('INSERT INTO sync_context (origin, changed_at) VALUES (?, ?)', ('', ''))
+        for change in changes:
+            current = cursor.execute(f'SELECT {", ".join(COLUMNS)} FROM coffee WHERE name = ?',
+                                     (change.name,)).fetchone()
+            if current == change.row:
+                continue
+            local = latest_local(cursor, change.name)
+            if local is not None and local >= (change.changed_at, change.origin):
+                conflicts += 1
+                continue
+            cursor.execute('UPDATE sync_context SET origin = ?, changed_at = ?', (change.origin, change.changed_at))
+            if change.row is None:
+                cursor.execute('DELETE FROM coffee WHERE name = ?', (change.name,))
+            else:
+                repository.upsert_many(cursor, [change.row])
+            applied += 1
+        cursor.execute('DELETE FROM sync_context')
+        cursor.execute('''
+            INSERT INTO sync_peers (peer_id, last_seq, synced_at) VALUES (?, ?, strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+            ON CONFLICT(peer_id) DO UPDATE SET last_seq = excluded.last_seq, synced_at = excluded.synced_at
+        ''', (peer_id, last_seq))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return applied, conflicts
+
+
+def pull(local, peer):
+    local_id = node_id(local.conn)
+    peer_id = node_id(peer.conn)
+    if local_id == peer_id:
+        raise ValueError("у баз одинаковый идентификатор узла: одна из них скопирована, "
+                         "выполните синхронизацию с --new-node-id")
+    with peer.reader() as conn:
+        last_seq, changes = read_changes(conn, last_seen(local.conn, peer_id), local_id)
+    applied, conflicts = apply_changes(local, peer_id, changes, last_seq)
+    return SyncResult(len(changes), applied, conflicts, last_seq)
+
+
+def sync(local, peer):
+    return pull(local, peer), pull(peer, local)
@@ -0,0 +1,212 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+
+
+COLUMNS = ('ID', 'Название', 'Обжарка', 'Тип', 'Вкус', 'Цена', 'Объем')
+NUMERIC_COLUMNS = (0, 5, 6)
+RANK_COLUMN = len(COLUMNS)
+
+
+class CoffeeTableModel(QAbstractTableModel):
+    PAGE_SIZE = 256
+
+    sortChanged = pyqtSignal(object, list)
+
+    def __init__(self, source, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self._rows = []
+        self._last_key = None
+        self._exhausted = True
+        self._query = None
+        self._params = []
+        self._ranked = False
+        self._sort_column = 1
+        self._sort_order = Qt.SortOrder.AscendingOrder
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(COLUMNS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return str(self._rows[index.row()][index.column()])
+        if role == Qt.ItemDataRole.TextAlignmentRole and index.column() in NUMERIC_COLUMNS:
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        query, params = self.page_query(self._query, self._params, self._ranked, self._last_key)
+        try:
+            rows = self.source.fetch(query, params)
+        except Exception as e:
+            self._exhausted = True
+            print(f"Ошибка загрузки данных: {e}")
+            return
+        self._exhausted = len(rows) < self.PAGE_SIZE
+        if rows:
+            self._last_key = self._sort_key(rows[-1], self._ranked)
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self._sort_column = column
+        self._sort_order = order
+        if self._query is not None:
+            self.sortChanged.emit(self._query, self._params)
+
+    def page_query(self, query, params, ranked=False, after=None):
+        descending = self._sort_order == Qt.SortOrder.DescendingOrder
+        return self.source.page_query(query, params, ranked, self._sort_column, descending,
+                                      after, self.PAGE_SIZE)
+
+    def set_result(self, query, params, rows, ranked=False):
+        self.beginResetModel()
+        self._query = query
+        self._params = list(params)
+        self._ranked = ranked
+        self._rows = list(rows)
+        self._exhausted = len(rows) < self.PAGE_SIZE
+        self._last_key = self._sort_key(rows[-1], ranked) if rows else None
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self._rows = []
+        self._exhausted = True
+        self._last_key = None
+        self.endResetModel()
+
+    def apply_row(self, row, matches):
+        current = self.find_row(row[0])
+        if current is None:
+            position = self._position(row) if matches else None
+            if position is not None:
+                self.beginInsertRows(QModelIndex(), position, position)
+                self._rows.insert(position, row)
+                self.endInsertRows()
+            return
+        if not matches:
+            self.remove_row(row[0])
+            return
+        if self._ranked:
+            self._rows[current] = tuple(row) + tuple(self._rows[current][RANK_COLUMN:])
+            self.dataChanged.emit(self.index(current, 0), self.index(current, len(COLUMNS) - 1))
+            return
+        del self._rows[current]
+        position = self._position(row)
+        self._rows.insert(current, row)
+        if position is None:
+            self.remove_row(row[0])
+            return
+        if position != current:
+            destination = position if position < current else position + 1
+            self.beginMoveRows(QModelIndex(), current, current, QModelIndex(), destination)
+            self._rows.insert(position, self._rows.pop(current))
+            self.endMoveRows()
+        self.dataChanged.emit(self.index(position, 0), self.index(position, len(COLUMNS) - 1))
+
+    def apply_rows(self, rows, matching_ids, removed_ids=()):
+        removed = set(removed_ids)
+        changed = {row[0]: row for row in rows}
+        old_ids = [row[0] for row in self._rows]
+        self.layoutAboutToBeChanged.emit()
+        result = []
+        for row in self._rows:
+            coffee_id = row[0]
+            if coffee_id in removed or (coffee_id in changed and coffee_id not in matching_ids):
+                continue
+            if coffee_id in changed:
+                row = tuple(changed.pop(coffee_id)) + tuple(row[RANK_COLUMN:])
+            result.append(row)
+        if self._ranked:
+            if self._exhausted:
+                result.extend(row for coffee_id, row in changed.items() if coffee_id in matching_ids)
+        else:
+            descending = self._sort_order == Qt.SortOrder.DescendingOrder
+            result.extend(row for coffee_id, row in changed.items() if coffee_id in matching_ids)
+            if not self._exhausted and self._last_key is not None:
+                result = [row for row in result
+                          if ((self._sort_key(row) >= self._last_key) if descending
+                              else (self._sort_key(row) <= self._last_key))]
+            result.sort(key=self._sort_key, reverse=descending)
+        self._rows = result
+        positions = {row[0]: position for position, row in enumerate(result)}
+        old_indexes = self.persistentIndexList()
+        new_indexes = []
+        for index in old_indexes:
+            position = positions.get(old_ids[index.row()]) if index.row() < len(old_ids) else None
+            new_indexes.append(QModelIndex() if position is None else self.index(position, index.column()))
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    def remove_row(self, coffee_id):
+        current = self.find_row(coffee_id)
+        if current is not None:
+            self.beginRemoveRows(QModelIndex(), current, current)
+            del self._rows[current]
+            self.endRemoveRows()
+
+    def find_row(self, coffee_id):
+        for position, row in enumerate(self._rows):
+            if row[0] == coffee_id:
+                return position
+        return None
+
+    def _sort_key(self, row, ranked=False):
+        if ranked:
+            return row[RANK_COLUMN], row[0]
+        value = row[self._sort_column]
+        return ('' if value is None else value), row[0]
+
+    def _position(self, row):
+        if self._ranked:
+            return len(self._rows) if self._exhausted else None
+        key = self._sort_key(row)
+        descending = self._sort_order == Qt.SortOrder.DescendingOrder
+        if not self._exhausted and self._last_key is not None:
+            if (key < self._last_key) if descending else (key > self._last_key):
+                return None
+        low, high = 0, len(self._rows)
+        while low < high:
+            middle = (low + high) // 2
+            other = self._sort_key(self._rows[middle])
+            if (other > key) if descending else (other < key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    @property
+    def query(self):
+        return self._query
+
+    @property
+    def params(self):
+        return self._params
+
+    @property
+    def ranked(self):
+        return self._ranked
+
+    def row_data(self, row):
+        return self._rows[row]
@@ -0,0 +1,320 @@
+import os
+import sqlite3
+import sys
+
+
+SAMPLE_DATA = [
+    ('Эфиопия Иргачефф', 'Светлая', 'В зернах', 'Цветочные ноты, бергамот, цитрус', 1250.00, 250),
+    ('Колумбия Супремо', 'Средняя', 'Молотый', 'Ореховый, карамельный, шоколадный', 890.00, 500),
+    ('Бразилия Сантос', 'Темная', 'В зернах', 'Шоколадный, пряный, дымный', 950.00, 250),
+    ('Кения АА', 'Средняя', 'В зернах', 'Ягодный, винный, томатный', 1350.00, 250),
+    ('Гватемала Антигуа', 'Средняя', 'Молотый', 'Шоколадный, ореховый, ванильный', 820.00, 500)
+]
+
+
+COLUMNS = ('name', 'roast_degree', 'ground_whole', 'taste_description', 'price', 'volume')
+
+
+def default_db_path():
+    if os.environ.get('ESPRESSO_DB'):
+        return os.environ['ESPRESSO_DB']
+    if getattr(sys, 'frozen', False):
+        application_path = os.path.dirname(sys.executable)
+    else:
+        application_path = os.path.dirname(os.path.abspath(__file__))
+
+    data_dir = os.path.join(application_path, 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, 'coffee.sqlite')
+
+
+def create_coffee_table(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS coffee (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            roast_degree TEXT NOT NULL,
+            ground_whole TEXT NOT NULL,
+            taste_description TEXT,
+            price REAL NOT NULL,
+            volume REAL NOT NULL
+        )
+    ''')
+    cursor.execute('SELECT 1 FROM coffee LIMIT 1')
+    if cursor.fetchone() is None:
+        cursor.executemany('''
+            INSERT INTO coffee (name, roast_degree, ground_whole, taste_description, price, volume)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', SAMPLE_DATA)
+
+
+def create_search_index(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'coffee_fts'")
+    fts_exists = cursor.fetchone() is not None
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS coffee_fts USING fts5(
+            name, taste_description, tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS coffee_fts_insert AFTER INSERT ON coffee BEGIN
+            INSERT INTO coffee_fts (rowid, name, taste_description)
+            VALUES (new.id, replace(replace(new.name, 'ё', 'е'), 'Ё', 'Е'),
+                    replace(replace(new.taste_description, 'ё', 'е'), 'Ё', 'Е'));
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS coffee_fts_delete AFTER DELETE ON coffee BEGIN
+            DELETE FROM coffee_fts WHERE rowid = old.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS coffee_fts_update AFTER UPDATE ON coffee BEGIN
+            DELETE FROM coffee_fts WHERE rowid = old.id;
+            INSERT INTO coffee_fts (rowid, name, taste_description)
+            VALUES (new.id, replace(replace(new.name, 'ё', 'е'), 'Ё', 'Е'),
+                    replace(replace(new.taste_description, 'ё', 'е'), 'Ё', 'Е'));
+        END
+    ''')
+    if not fts_exists:
+        cursor.execute('''
+            INSERT INTO coffee_fts (rowid, name, taste_description)
+            SELECT id, replace(replace(name, 'ё', 'е'), 'Ё', 'Е'),
+                   replace(replace(taste_description, 'ё', 'е'), 'Ё', 'Е')
+            FROM coffee
+        ''')
+
+
+def create_filter_indexes(cursor):
+    cursor.execute('CREATE INDEX IF NOT EXISTS coffee_roast_ground_name ON coffee (roast_degree, ground_whole, name)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS coffee_roast_name ON coffee (roast_degree, name)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS coffee_ground_name ON coffee (ground_whole, name)')
+
+
+def create_sort_indexes(cursor):
+    cursor.execute('CREATE INDEX IF NOT EXISTS coffee_roast ON coffee (roast_degree)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS coffee_ground ON coffee (ground_whole)')
+    cursor.execute("CREATE INDEX IF NOT EXISTS coffee_taste ON coffee (IFNULL(taste_description, ''))")
+    cursor.execute('CREATE INDEX IF NOT EXISTS coffee_price ON coffee (price)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS coffee_volume ON coffee (volume)')
+
+
+def create_change_log(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS coffee_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            coffee_id INTEGER NOT NULL,
+            op TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS coffee_changes_insert AFTER INSERT ON coffee BEGIN
+            INSERT INTO coffee_changes (coffee_id, op) VALUES (new.id, 'insert');
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS coffee_changes_update AFTER UPDATE ON coffee BEGIN
+            INSERT INTO coffee_changes (coffee_id, op) VALUES (new.id, 'update');
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS coffee_changes_delete AFTER DELETE ON coffee BEGIN
+            INSERT INTO coffee_changes (coffee_id, op) VALUES (old.id, 'delete');
+        END
+    ''')
+
+
+CHANGE_ORIGIN = "COALESCE((SELECT origin FROM sync_context), (SELECT value FROM sync_state WHERE key = 'node_id'))"
+CHANGE_TIME = "COALESCE((SELECT changed_at FROM sync_context), strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))"
+BASELINE_TIME = '1970-01-01T00:00:00.000Z'
+
+
+def extend_change_log(cursor):
+    for column in ('name TEXT', 'old_name TEXT', 'origin TEXT', 'changed_at TEXT'):
+        cursor.execute(f'ALTER TABLE coffee_changes ADD COLUMN {column}')
+    cursor.execute('CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+    cursor.execute("INSERT OR IGNORE INTO sync_state (key, value) VALUES ('node_id', lower(hex(randomblob(16))))")
+    cursor.execute('CREATE TABLE IF NOT EXISTS sync_context (origin TEXT NOT NULL, changed_at TEXT NOT NULL)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_peers (
+            peer_id TEXT PRIMARY KEY,
+            last_seq INTEGER NOT NULL DEFAULT 0,
+            synced_at TEXT
+        )
+    ''')
+    for name in ('insert', 'update', 'delete'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS coffee_changes_{name}')
+    cursor.execute(f'''
+        CREATE TRIGGER coffee_changes_insert AFTER INSERT ON coffee BEGIN
+            INSERT INTO coffee_changes (coffee_id, op, name, origin, changed_at)
+            VALUES (new.id, 'insert', new.name, {CHANGE_ORIGIN}, {CHANGE_TIME});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER coffee_changes_update AFTER UPDATE ON coffee BEGIN
+            INSERT INTO coffee_changes (coffee_id, op, name, old_name, origin, changed_at)
+            VALUES (new.id, 'update', new.name, CASE WHEN old.name IS NOT new.name THEN old.name END,
+                    {CHANGE_ORIGIN}, {CHANGE_TIME});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER coffee_changes_delete AFTER DELETE ON coffee BEGIN
+            INSERT INTO coffee_changes (coffee_id, op, name, origin, changed_at)
+            VALUES (old.id, 'delete', old.name, {CHANGE_ORIGIN}, {CHANGE_TIME});
+        END
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS coffee_changes_name ON coffee_changes (name, changed_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS coffee_changes_old_name ON coffee_changes (old_name, changed_at) '
+                   'WHERE old_name IS NOT NULL')
+    cursor.execute(f'''
+        INSERT INTO coffee_changes (coffee_id, op, name, origin, changed_at)
+        SELECT id, 'insert', name, {CHANGE_ORIGIN}, ? FROM coffee ORDER BY id
+    ''', (BASELINE_TIME,))
+
+
+def create_search_vocabulary(cursor):
+    cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS coffee_fts_vocab USING fts5vocab(coffee_fts, 'row')")
+
+
+def limit_search_index_updates(cursor):
+    cursor.execute('DROP TRIGGER IF EXISTS coffee_fts_update')
+    cursor.execute('''
+        CREATE TRIGGER coffee_fts_update AFTER UPDATE OF name, taste_description ON coffee BEGIN
+            DELETE FROM coffee_fts WHERE rowid = old.id;
+            INSERT INTO coffee_fts (rowid, name, taste_description)
+            VALUES (new.id, replace(replace(new.name, 'ё', 'е'), 'Ё', 'Е'),
+                    replace(replace(new.taste_description, 'ё', 'е'), 'Ё', 'Е'));
+        END
+    ''')
+
+
+SUMMARY_COLUMNS = 'roast_degree, ground_whole, count, price_cents, volume, min_price, max_price'
+SUMMARY_AGGREGATES = 'COUNT(*), SUM(CAST(ROUND(price * 100) AS INTEGER)), SUM(volume), MIN(price), MAX(price)'
+
+
+def summary_remove(row):
+    category = f'roast_degree = {row}.roast_degree AND ground_whole = {row}.ground_whole'
+    return f'''
+            UPDATE coffee_summary
+            SET count = count - 1,
+                price_cents = price_cents - CAST(ROUND({row}.price * 100) AS INTEGER),
+                volume = volume - {row}.volume,
+                min_price = CASE WHEN {row}.price > min_price THEN min_price
+                                 ELSE (SELECT MIN(price) FROM coffee WHERE {category}) END,
+                max_price = CASE WHEN {row}.price < max_price THEN max_price
+                                 ELSE (SELECT MAX(price) FROM coffee WHERE {category}) END
+            WHERE {category};
+            DELETE FROM coffee_summary WHERE {category} AND count = 0;
+    '''
+
+
+def summary_add(row):
+    return f'''
+            INSERT INTO coffee_summary ({SUMMARY_COLUMNS})
+            VALUES ({row}.roast_degree, {row}.ground_whole, 1, CAST(ROUND({row}.price * 100) AS INTEGER),
+                    {row}.volume, {row}.price, {row}.price)
+            ON CONFLICT (roast_degree, ground_whole) DO UPDATE SET
+                count = count + 1,
+                price_cents = price_cents + excluded.price_cents,
+                volume = volume + excluded.volume,
+                min_price = MIN(min_price, excluded.min_price),
+                max_price = MAX(max_price, excluded.max_price);
+    '''
+
+
+def rebuild_summary(cursor):
+    cursor.execute('DELETE FROM coffee_summary')
+    cursor.execute(f'''
+        INSERT INTO coffee_summary ({SUMMARY_COLUMNS})
+        SELECT roast_degree, ground_whole, {SUMMARY_AGGREGATES} FROM coffee GROUP BY roast_degree, ground_whole
+    ''')
+
+
+def create_price_summary(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS coffee_summary (
+            roast_degree TEXT NOT NULL,
+            ground_whole TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            price_cents INTEGER NOT NULL,
+            volume REAL NOT NULL,
+            min_price REAL,
+            max_price REAL,
+            PRIMARY KEY (roast_degree, ground_whole)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS coffee_roast_ground_price ON coffee (roast_degree, ground_whole, price)')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS coffee_summary_insert AFTER INSERT ON coffee BEGIN
+            {summary_add('new')}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS coffee_summary_delete AFTER DELETE ON coffee BEGIN
+            {summary_remove('old')}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS coffee_summary_update AFTER UPDATE OF roast_degree, ground_whole, price, volume ON coffee
+        WHEN old.roast_degree IS NOT new.roast_degree OR old.ground_whole IS NOT new.ground_whole
+             OR old.price IS NOT new.price OR old.volume IS NOT new.volume
+        BEGIN
+            {summary_remove('old')}
+            {summary_add('new')}
+        END
+    ''')
+    rebuild_summary(cursor)
+
+
+def guard_change_log_updates(cursor):
+    cursor.execute('DROP TRIGGER IF EXISTS coffee_changes_update')
+    changed = ' OR '.join(f'old.{column} IS NOT new.{column}' for column in COLUMNS)
+    cursor.execute(f'''
+        CREATE TRIGGER coffee_changes_update AFTER UPDATE ON coffee WHEN {changed} BEGIN
+            INSERT INTO coffee_changes (coffee_id, op, name, old_name, origin, changed_at)
+            VALUES (new.id, 'update', new.name, CASE WHEN old.name IS NOT new.name THEN old.name END,
+                    {CHANGE_ORIGIN}, {CHANGE_TIME});
+        END
+    ''')
+
+
+MIGRATIONS = [
+    create_coffee_table,
+    create_search_index,
+    create_filter_indexes,
+    create_sort_indexes,
+    create_change_log,
+    extend_change_log,
+    create_search_vocabulary,
+    limit_search_index_updates,
+    create_price_summary,
+    guard_change_log_updates,
+]
+
+
+def configure_connection(conn):
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('PRAGMA cache_size = -16000')
+    conn.execute('PRAGMA mmap_size = 268435456')
+    conn.execute('PRAGMA temp_store = MEMORY')
+
+
+def connect(db_path, **kwargs):
+    conn = sqlite3.connect(db_path, **kwargs)
+    configure_connection(conn)
+    return conn
+
+
+def migrate(conn):
+    conn.execute('PRAGMA journal_mode = WAL')
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], version + 1):
+        cursor = conn.cursor()
+        cursor.execute('BEGIN')
+        try:
+            migration(cursor)
+            cursor.execute(f'PRAGMA user_version = {number}')
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
@@ -0,0 +1,132 @@
+import heapq
+import itertools
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from repository import ALL, search_words
+
+
+def trigrams(word):
+    padded = f'  {word} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def similarity(left, right):
+    shared = len(left & right)
+    return shared / (len(left) + len(right) - shared)
+
+
+class FuzzySearch:
+    MIN_LENGTH = 3
+    FULL_RELOAD_CHANGES = 10000
+    ALTERNATIVES = 5
+    THRESHOLD = 0.3
+    COMBINATIONS = 10
+    LIMIT = 200
+
+    def __init__(self, repository):
+        self.repository = repository
+        self.seq = None
+        self._lock = threading.Lock()
+
+    def reload(self, conn):
+        self.terms = []
+        self.grams = []
+        self.postings = {}
+        self.known = set()
+        self._sorted = None
+        for (term,) in conn.execute("SELECT term FROM coffee_fts_vocab WHERE term NOT GLOB '*[0-9]*'"):
+            self._add(term)
+
+    def refresh(self, conn):
+        seq = conn.execute('SELECT IFNULL(MAX(seq), 0) FROM coffee_changes').fetchone()[0]
+        if seq == self.seq:
+            return
+        if self.seq is None or seq - self.seq > self.FULL_RELOAD_CHANGES:
+            self.reload(conn)
+        else:
+            for name, taste_description in conn.execute('''
+                SELECT name, taste_description FROM coffee
+                WHERE id IN (SELECT coffee_id FROM coffee_changes WHERE seq > ?)
+            ''', (self.seq,)):
+                for word in search_words(f'{name} {taste_description or ""}'):
+                    if not any(char.isdigit() for char in word):
+                        self._add(word)
+        self.seq = seq
+
+    def _add(self, term):
+        if term in self.known or len(term) < self.MIN_LENGTH:
+            return
+        self.known.add(term)
+        self._sorted = None
+        number = len(self.terms)
+        self.terms.append(term)
+        grams = trigrams(term)
+        self.grams.append(len(grams))
+        for gram in grams:
+            self.postings.setdefault(gram, array('I')).append(number)
+
+    def _has_prefix(self, word):
+        if self._sorted is None:
+            self._sorted = sorted(self.known)
+        position = bisect_left(self._sorted, word)
+        return position < len(self._sorted) and self._sorted[position].startswith(word)
+
+    def similar(self, word):
+        grams = trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        scored = ((count / (len(grams) + self.grams[number] - count), self.terms[number])
+                  for number, count in shared.items())
+        return [(term, score) for score, term in heapq.nlargest(self.ALTERNATIVES, scored)
+                if score >= self.THRESHOLD]
+
+    def corrections(self, conn, text):
+        self.refresh(conn)
+        result = []
+        for word in search_words(text):
+            if len(word) < self.MIN_LENGTH or any(char.isdigit() for char in word) or self._has_prefix(word):
+                result.append((word, None))
+            else:
+                result.append((word, self.similar(word)))
+        return result
+
+    def suggest(self, conn, text):
+        corrections = self.corrections(conn, text)
+        if not corrections or any(alternatives == [] for _, alternatives in corrections):
+            return None
+        if all(alternatives is None for _, alternatives in corrections):
+            return None
+        return ' '.join(word if alternatives is None else alternatives[0][0] for word, alternatives in corrections)
+
+    def search(self, conn, text, roast_degree=ALL, ground_whole=ALL):
+        corrections = self.corrections(conn, text)
+        if not corrections or any(alternatives == [] for _, alternatives in corrections):
+            return None
+        options = [[(f'"{word}"*', 1.0)] if alternatives is None else
+                   [(f'"{term}"', score) for term, score in alternatives]
+                   for word, alternatives in corrections]
+        combinations = heapq.nlargest(self.COMBINATIONS, itertools.product(*options),
+                                      key=lambda combination: sum(score for _, score in combination))
+        rows = []
+        seen = set()
+        for combination in combinations:
+            if len(rows) >= self.LIMIT:
+                break
+            query, params, _ = self.repository.match_query(
+                ' AND '.join(term for term, _ in combination), roast_degree, ground_whole)
+            score = sum(score for _, score in combination) / len(combination)
+            for row in self.repository.execute(conn, f'{query} LIMIT ?', [*params, self.LIMIT - len(rows)]):
+                if row[0] not in seen:
+                    seen.add(row[0])
+                    rows.append((*row[:7], -score))
+        match = ' AND '.join('(' + ' OR '.join(term for term, _ in option) + ')' for option in options)
+        query, params, _ = self.repository.match_query(match, roast_degree, ground_whole)
+        return query, params, rows
+
+    def lookup(self, conn, text, roast_degree=ALL, ground_whole=ALL, with_rows=True):
+        with self._lock:
+            found = self.search(conn, text, roast_degree, ground_whole) if with_rows else None
+            return found, self.suggest(conn, text)
@@ -0,0 +1,60 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+from logging.handlers import RotatingFileHandler
+
+
+Sample = namedtuple('Sample', 'query elapsed rows statements')
+
+
+class QueryProfiler:
+    def __init__(self, log_path, slow_ms=100, max_bytes=1024 * 1024, backup_count=3):
+        self.slow_ms = slow_ms
+        self.last = None
+        self._local = threading.local()
+        self.log = logging.getLogger(f'espresso.slow_queries.{log_path}')
+        self.log.setLevel(logging.INFO)
+        self.log.propagate = False
+        if not self.log.handlers:
+            handler = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            self.log.addHandler(handler)
+
+    def attach(self, conn):
+        conn.set_trace_callback(self._trace)
+
+    @staticmethod
+    def detach(conn):
+        conn.set_trace_callback(None)
+
+    def _trace(self, statement):
+        self._local.statements = getattr(self._local, 'statements', 0) + 1
+
+    def run(self, conn, query, params, fetch):
+        statements = getattr(self._local, 'statements', 0)
+        started = time.perf_counter()
+        cursor = conn.execute(query, params)
+        result = fetch(cursor)
+        elapsed = time.perf_counter() - started
+        if isinstance(result, list):
+            rows = len(result)
+        else:
+            rows = cursor.rowcount if cursor.rowcount >= 0 else int(result is not None)
+        sample = Sample(query, elapsed, rows, getattr(self._local, 'statements', 0) - statements)
+        self.last = sample
+        if elapsed * 1000 >= self.slow_ms:
+            self.log_slow(conn, query, params, sample)
+        return result
+
+    def log_slow(self, conn, query, params, sample):
+        try:
+            plan = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {query}', params)]
+        except Exception as e:
+            plan = [f'план недоступен: {e}']
+        self.log.info('%.1f ms, %d rows, %d statements\n  %s\n  params: %r\n  plan:\n    %s',
+                      sample.elapsed * 1000, sample.rows, sample.statements,
+                      ' '.join(query.split()), list(params), '\n    '.join(plan))
+
+    def log_error(self, message):
+        self.log.error('ошибка: %s', message)
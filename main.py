@@ -1,10 +1,21 @@
+import html
+import os
 import sys
 import sqlite3
-import os
-from PyQt6.QtWidgets import QApplication, QMainWindow, QTableWidgetItem, QDialog, QMessageBox, QPushButton
-from PyQt6.QtCore import Qt
+import time
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QDialog, QMessageBox, QPushButton, QCheckBox, QLabel,
+                             QTableWidget, QTableWidgetItem, QAbstractItemView, QHeaderView)
+from PyQt6.QtCore import Qt, QTimer, QSettings
 from main_des import MainDesign
 from edit_des import EditDesign
+from bulk_des import BulkDesign
+from coffee_model import CoffeeTableModel
+from database import default_db_path
+from query_scheduler import QueryScheduler
+from repository import CoffeeRepository, Summary, id_selection, query_selection, search_words
+
+
+SUMMARY_HEADERS = ('Обжарка', 'Тип', 'Позиций', 'Мин. цена', 'Средняя цена', 'Макс. цена', 'Цена за грамм')
 
 
 class AddEditCoffeeForm(QDialog, EditDesign):
@@ -13,7 +24,7 @@ class AddEditCoffeeForm(QDialog, EditDesign):
         self.setupUi(self)
         self.coffee_id = coffee_id
 
-        self.db_path = parent.db_path if parent else self.get_db_path()
+        self.repository = parent.repository if parent else CoffeeRepository(default_db_path())
 
         self.buttonBox.accepted.connect(self.accept)
         self.buttonBox.rejected.connect(self.reject)
@@ -21,34 +32,20 @@ class AddEditCoffeeForm(QDialog, EditDesign):
         if coffee_id:
             self.load_coffee_data()
 
-    def get_db_path(self):
-        if getattr(sys, 'frozen', False):
-            application_path = os.path.dirname(sys.executable)
-        else:
-            application_path = os.path.dirname(os.path.abspath(__file__))
-
-        data_dir = os.path.join(application_path, 'data')
-        os.makedirs(data_dir, exist_ok=True)
-        return os.path.join(data_dir, 'coffee.sqlite')
-
     def load_coffee_data(self):
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM coffee WHERE id = ?', (self.coffee_id,))
-            coffee = cursor.fetchone()
-            conn.close()
+            coffee = self.repository.get(self.coffee_id)
             if coffee:
-                self.nameEdit.setText(coffee[1])
-                index = self.roastCombo.findText(coffee[2])
+                self.nameEdit.setText(coffee.name)
+                index = self.roastCombo.findText(coffee.roast_degree)
                 if index >= 0:
                     self.roastCombo.setCurrentIndex(index)
-                index = self.typeCombo.findText(coffee[3])
+                index = self.typeCombo.findText(coffee.ground_whole)
                 if index >= 0:
                     self.typeCombo.setCurrentIndex(index)
-                self.tasteEdit.setText(coffee[4])
-                self.priceSpin.setValue(float(coffee[5]))
-                self.volumeSpin.setValue(int(coffee[6]))
+                self.tasteEdit.setText(coffee.taste_description)
+                self.priceSpin.setValue(float(coffee.price))
+                self.volumeSpin.setValue(int(coffee.volume))
         except Exception as e:
             print(f"Ошибка загрузки данных: {e}")
 
@@ -63,63 +60,97 @@ class AddEditCoffeeForm(QDialog, EditDesign):
         }
 
 
+class BulkEditForm(QDialog, BulkDesign):
+    def __init__(self, parent=None, selected=0, filtered=0):
+        super().__init__(parent)
+        self.setupUi(self)
+        self.selectionRadio.setText(f"Выделенным строкам ({selected})")
+        self.filterRadio.setText(f"Всем строкам текущего фильтра ({filtered})")
+        if not selected:
+            self.selectionRadio.setEnabled(False)
+            self.filterRadio.setChecked(True)
+        self.priceSpin.setEnabled(False)
+        self.priceModeCombo.currentIndexChanged.connect(lambda index: self.priceSpin.setEnabled(index > 0))
+
+        self.buttonBox.accepted.connect(self.accept)
+        self.buttonBox.rejected.connect(self.reject)
+
+    def get_changes(self):
+        changes = {}
+        if self.roastCombo.currentIndex() > 0:
+            changes['roast_degree'] = self.roastCombo.currentText()
+        if self.typeCombo.currentIndex() > 0:
+            changes['ground_whole'] = self.typeCombo.currentText()
+        if self.priceModeCombo.currentIndex() == 1 and self.priceSpin.value():
+            changes['price_factor'] = 1 + self.priceSpin.value() / 100
+        elif self.priceModeCombo.currentIndex() == 2 and self.priceSpin.value():
+            changes['price_delta'] = self.priceSpin.value()
+        return changes
+
+
 class CoffeeApp(QMainWindow, MainDesign):
+    INCREMENTAL_LIMIT = 5000
+
     def __init__(self):
         super().__init__()
         self.setupUi(self)
         self.setGeometry(100, 100, 1200, 700)
 
-        self.db_path = self.get_db_path()
+        self.db_path = default_db_path()
+        self.repository = None
+        self.pending_query = None
 
-        self.init_database()
         self.setup_connections()
-        self.load_coffee_data()
+        self.statusbar.showMessage("Загрузка...")
+        QTimer.singleShot(0, self.start)
 
-    def get_db_path(self):
-        if getattr(sys, 'frozen', False):
-            application_path = os.path.dirname(sys.executable)
-        else:
-            application_path = os.path.dirname(os.path.abspath(__file__))
-
-        data_dir = os.path.join(application_path, 'data')
-        os.makedirs(data_dir, exist_ok=True)
-
-        return os.path.join(data_dir, 'coffee.sqlite')
+    def start(self):
+        self.init_database()
+        if self.repository is None:
+            return
+        self.setup_table()
+        self.setup_diagnostics()
+        self.setup_summary()
+        self.load_coffee_data()
 
     def init_database(self):
         try:
-            self.conn = sqlite3.connect(self.db_path)
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS coffee (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL UNIQUE,
-                    roast_degree TEXT NOT NULL,
-                    ground_whole TEXT NOT NULL,
-                    taste_description TEXT,
-                    price REAL NOT NULL,
-                    volume REAL NOT NULL
-                )
-            ''')
-            sample_data = [
-                ('Эфиопия Иргачефф', 'Светлая', 'В зернах', 'Цветочные ноты, бергамот, цитрус', 1250.00, 250),
-                ('Колумбия Супремо', 'Средняя', 'Молотый', 'Ореховый, карамельный, шоколадный', 890.00, 500),
-                ('Бразилия Сантос', 'Темная', 'В зернах', 'Шоколадный, пряный, дымный', 950.00, 250),
-                ('Кения АА', 'Средняя', 'В зернах', 'Ягодный, винный, томатный', 1350.00, 250),
-                ('Гватемала Антигуа', 'Средняя', 'Молотый', 'Шоколадный, ореховый, ванильный', 820.00, 500)
-            ]
-            for data in sample_data:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO coffee 
-                    (name, roast_degree, ground_whole, taste_description, price, volume)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', data)
-            self.conn.commit()
+            server_url = os.environ.get('ESPRESSO_SERVER')
+            if server_url:
+                from remote_repository import RemoteRepository
+                self.repository = RemoteRepository(server_url)
+            else:
+                self.repository = CoffeeRepository(self.db_path)
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось инициализировать базу данных: {str(e)}")
 
+    def setup_table(self):
+        self.coffee_model = CoffeeTableModel(self.repository, self)
+        self.coffeeTable.setModel(self.coffee_model)
+        self.coffee_model.sortChanged.connect(self.resort)
+        self.query_scheduler = QueryScheduler(self.repository, self)
+        self.query_scheduler.finished.connect(self.on_query_finished)
+        self.query_scheduler.failed.connect(self.on_query_failed)
+        self.fuzzy_scheduler = QueryScheduler(self.repository, self)
+        self.fuzzy_scheduler.finished.connect(self.on_fuzzy_finished)
+        self.fuzzy_scheduler.failed.connect(self.on_fuzzy_failed)
+        self.coffeeTable.horizontalHeader().setSortIndicator(1, Qt.SortOrder.AscendingOrder)
+        self.coffeeTable.setSortingEnabled(True)
+        self.coffeeTable.horizontalHeader().sectionClicked.connect(
+            lambda: self.coffeeTable.horizontalHeader().setSortIndicatorShown(True))
+
     def setup_connections(self):
-        self.searchInput.textChanged.connect(self.filter_data)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.filter_data)
+        self.searchInput.textChanged.connect(self.search_timer.start)
+        self.fuzzy_search = None
+        self.pending_fuzzy = None
+        self.suggestionLabel = QLabel()
+        self.suggestionLabel.setVisible(False)
+        self.suggestionLabel.linkActivated.connect(self.searchInput.setText)
+        self.verticalLayout.insertWidget(1, self.suggestionLabel)
         self.roastFilter.currentTextChanged.connect(self.filter_data)
         self.typeFilter.currentTextChanged.connect(self.filter_data)
 
@@ -129,64 +160,270 @@ class CoffeeApp(QMainWindow, MainDesign):
         self.horizontalLayout.addWidget(self.editButton)
         self.deleteButton = QPushButton("Удалить")
         self.horizontalLayout.addWidget(self.deleteButton)
+        self.bulkButton = QPushButton("Массовое изменение")
+        self.horizontalLayout.addWidget(self.bulkButton)
 
         self.addButton.clicked.connect(self.add_coffee)
         self.editButton.clicked.connect(self.edit_coffee)
         self.deleteButton.clicked.connect(self.delete_coffee)
+        self.bulkButton.clicked.connect(self.bulk_edit)
 
-    def load_coffee_data(self, query=None, params=None):
-        try:
-            self.coffeeTable.setSortingEnabled(False)
-            if query is None:
-                query = 'SELECT id, name, roast_degree, ground_whole, taste_description, price, volume FROM coffee ORDER BY name'
-                params = []
-            cursor = self.conn.cursor()
-            cursor.execute(query, params)
-            coffee_data = cursor.fetchall()
-            self.coffeeTable.setRowCount(0)
-            for row_data in coffee_data:
-                row_position = self.coffeeTable.rowCount()
-                self.coffeeTable.insertRow(row_position)
-                for col_idx, cell_data in enumerate(row_data):
-                    item = QTableWidgetItem(str(cell_data))
-                    if col_idx in [0, 5, 6]:
-                        item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
-                    self.coffeeTable.setItem(row_position, col_idx, item)
-            self.coffeeTable.setSortingEnabled(True)
-        except Exception as e:
-            print(f"Ошибка загрузки данных: {e}")
+    def setup_diagnostics(self):
+        self.settings = QSettings("Espresso", "Espresso")
+        self.profiler = None
+        self.timingLabel = QLabel()
+        self.statusbar.addPermanentWidget(self.timingLabel)
+        self.diagnosticsCheck = QCheckBox("Диагностика")
+        self.statusbar.addPermanentWidget(self.diagnosticsCheck)
+        self.diagnosticsCheck.setChecked(self.settings.value('diagnostics/enabled', False, type=bool))
+        self.diagnosticsCheck.toggled.connect(self.set_diagnostics)
+        self.set_diagnostics(self.diagnosticsCheck.isChecked())
+        self.catalog_cache = None
+        self.cacheCheck = QCheckBox("Кэш в памяти")
+        self.statusbar.addPermanentWidget(self.cacheCheck)
+        self.cacheCheck.setChecked(self.settings.value('cache/enabled', False, type=bool))
+        self.cacheCheck.toggled.connect(self.set_cache)
+        self.cacheCheck.setVisible(isinstance(self.repository, CoffeeRepository))
+        self.bulkButton.setVisible(isinstance(self.repository, CoffeeRepository))
+        if self.cacheCheck.isChecked() and self.cacheCheck.isVisibleTo(self):
+            self.set_cache(True)
+
+    def setup_summary(self):
+        self.summaryTable = QTableWidget(0, len(SUMMARY_HEADERS))
+        self.summaryTable.setHorizontalHeaderLabels(SUMMARY_HEADERS)
+        self.summaryTable.verticalHeader().setVisible(False)
+        self.summaryTable.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.summaryTable.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.summaryTable.setMaximumHeight(180)
+        self.verticalLayout.addWidget(self.summaryTable)
+        self.summaryTable.setVisible(isinstance(self.repository, CoffeeRepository))
+        self.summary_scheduler = QueryScheduler(self.repository, self)
+        self.summary_scheduler.finished.connect(self.on_summary_finished)
+        self.summary_scheduler.failed.connect(
+            lambda generation, message: print(f"Ошибка загрузки сводки: {message}"))
+
+    def set_diagnostics(self, enabled):
+        self.settings.setValue('diagnostics/enabled', enabled)
+        if enabled and self.profiler is None:
+            from instrumentation import QueryProfiler
+            log_path = os.path.join(os.path.dirname(self.db_path), 'slow_queries.log')
+            self.profiler = QueryProfiler(log_path, self.settings.value('diagnostics/slow_ms', 100, type=int))
+        self.repository.set_profiler(self.profiler if enabled else None)
+        self.timingLabel.setVisible(enabled)
+        self.timingLabel.clear()
+
+    def set_cache(self, enabled):
+        self.settings.setValue('cache/enabled', enabled)
+        if enabled and self.catalog_cache is None:
+            from catalog_cache import CatalogCache
+            try:
+                self.catalog_cache = CatalogCache(self.repository)
+            except Exception as e:
+                print(f"Ошибка загрузки кэша: {e}")
+                return
+        elif not enabled and self.catalog_cache is not None:
+            self.catalog_cache.close()
+            self.catalog_cache = None
+        self.coffee_model.source = self.catalog_cache or self.repository
+        if self.coffee_model.query is not None:
+            self.filter_data()
+
+    def show_timing(self, render_time):
+        sample = self.profiler.last
+        if sample is not None:
+            self.timingLabel.setText(f"SQL {sample.elapsed * 1000:.1f} мс · строк {sample.rows} · "
+                                     f"отрисовка {render_time * 1000:.1f} мс")
+
+    def load_coffee_data(self, query=None, params=None, ranked=False):
+        source = self.coffee_model.source
+        self.pending_fuzzy = None
+        if query is None:
+            query, params, ranked = source.filter_query()
+        params = list(params or [])
+        if source is self.catalog_cache:
+            self.query_scheduler.cancel()
+            self.pending_query = None
+            started = time.perf_counter()
+            try:
+                rows = source.fetch(*self.coffee_model.page_query(query, params, ranked))
+            except Exception as e:
+                print(f"Ошибка загрузки данных: {e}")
+                return
+            fetched = time.perf_counter()
+            self.statusbar.clearMessage()
+            self.coffee_model.set_result(query, params, rows, ranked)
+            if self.repository.profiler is not None:
+                self.coffeeTable.viewport().repaint()
+                self.timingLabel.setText(f"кэш {(fetched - started) * 1000:.1f} мс · строк {len(rows)} · "
+                                         f"отрисовка {(time.perf_counter() - fetched) * 1000:.1f} мс")
+            self.offer_correction(rows)
+            self.refresh_summary()
+            return
+        generation = self.query_scheduler.submit(*self.coffee_model.page_query(query, params, ranked))
+        self.pending_query = (generation, query, params, ranked)
+
+    def resort(self, query, params):
+        if self.pending_query is not None:
+            self.load_coffee_data(*self.pending_query[1:])
+        else:
+            self.load_coffee_data(query, params)
+
+    def on_query_finished(self, generation, rows):
+        if self.pending_query is None or self.pending_query[0] != generation:
+            return
+        _, query, params, ranked = self.pending_query
+        self.pending_query = None
+        self.statusbar.clearMessage()
+        if self.repository.profiler is None:
+            self.coffee_model.set_result(query, params, rows, ranked)
+            self.offer_correction(rows)
+            self.refresh_summary()
+            return
+        started = time.perf_counter()
+        self.coffee_model.set_result(query, params, rows, ranked)
+        self.coffeeTable.viewport().repaint()
+        self.show_timing(time.perf_counter() - started)
+        self.offer_correction(rows)
+        self.refresh_summary()
+
+    def offer_correction(self, rows):
+        text = self.searchInput.text()
+        self.suggestionLabel.setVisible(False)
+        self.pending_fuzzy = None
+        if rows or not search_words(text) or not isinstance(self.repository, CoffeeRepository):
+            return
+        if self.fuzzy_search is None:
+            from fuzzy_search import FuzzySearch
+            self.fuzzy_search = FuzzySearch(self.repository)
+        fuzzy_search = self.fuzzy_search
+        roast_degree, ground_whole = self.roastFilter.currentText(), self.typeFilter.currentText()
+        with_rows = self.coffee_model.source is self.repository
+        generation = self.fuzzy_scheduler.submit_job(
+            lambda conn: [fuzzy_search.lookup(conn, text, roast_degree, ground_whole, with_rows)])
+        self.pending_fuzzy = (generation, self.coffee_model.query)
+
+    def on_fuzzy_finished(self, generation, result):
+        if self.pending_fuzzy != (generation, self.coffee_model.query):
+            return
+        self.pending_fuzzy = None
+        found, suggestion = result[0]
+        message = "Ничего не найдено."
+        if found and found[2]:
+            self.coffee_model.set_result(*found, ranked=True)
+            message = "Точных совпадений нет, показаны похожие."
+            self.refresh_summary()
+        if suggestion:
+            message += f' Возможно, вы имели в виду: <a href="{html.escape(suggestion)}">{html.escape(suggestion)}</a>'
+        self.suggestionLabel.setText(message)
+        self.suggestionLabel.setVisible(True)
+
+    def on_fuzzy_failed(self, generation, message):
+        if self.fuzzy_scheduler.is_current(generation):
+            self.pending_fuzzy = None
+            print(f"Ошибка нечеткого поиска: {message}")
+
+    def refresh_summary(self):
+        if not self.summaryTable.isVisibleTo(self) or self.coffee_model.query is None:
+            return
+        if search_words(self.searchInput.text()):
+            query, params = self.repository.grouped_summary_query(*self.view_query())
+        else:
+            query, params = self.repository.summary_query(self.roastFilter.currentText(), self.typeFilter.currentText())
+        self.summary_scheduler.submit(query, params)
+
+    def on_summary_finished(self, generation, rows):
+        if not self.summary_scheduler.is_current(generation):
+            return
+        rows = [Summary._make(row) for row in rows]
+        if len(rows) > 1:
+            rows.append(Summary("Итого", "", sum(row.count for row in rows), sum(row.price_cents for row in rows),
+                                sum(row.volume for row in rows), min(row.min_price for row in rows),
+                                max(row.max_price for row in rows)))
+        self.summaryTable.setRowCount(len(rows))
+        for position, row in enumerate(rows):
+            price = row.price_cents / 100
+            values = (row.roast_degree, row.ground_whole, str(row.count), f"{row.min_price:.2f}",
+                      f"{price / row.count:.2f}", f"{row.max_price:.2f}",
+                      f"{price / row.volume:.2f}" if row.volume else "—")
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column >= 2:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.summaryTable.setItem(position, column, item)
+
+    def on_query_failed(self, generation, message):
+        if self.query_scheduler.is_current(generation):
+            self.pending_query = None
+            self.statusbar.clearMessage()
+            print(f"Ошибка загрузки данных: {message}")
+            if self.repository.profiler is not None:
+                self.repository.profiler.log_error(message)
 
     def filter_data(self):
-        search_text = self.searchInput.text().strip()
-        roast_filter = self.roastFilter.currentText()
-        type_filter = self.typeFilter.currentText()
-        query = 'SELECT id, name, roast_degree, ground_whole, taste_description, price, volume FROM coffee WHERE 1=1'
-        params = []
-        if search_text:
-            query += ' AND (name LIKE ? OR taste_description LIKE ?)'
-            params.extend([f'%{search_text}%', f'%{search_text}%'])
-        if roast_filter != "Все":
-            query += ' AND roast_degree = ?'
-            params.append(roast_filter)
-        if type_filter != "Все":
-            query += ' AND ground_whole = ?'
-            params.append(type_filter)
-        query += ' ORDER BY name'
-        self.load_coffee_data(query, params)
+        if self.repository is None:
+            return
+        query, params, ranked = self.coffee_model.source.filter_query(
+            self.searchInput.text(), self.roastFilter.currentText(), self.typeFilter.currentText())
+        self.coffeeTable.horizontalHeader().setSortIndicatorShown(not ranked)
+        self.load_coffee_data(query, params, ranked)
+
+    def apply_change(self, coffee=None, deleted_id=None):
+        if self.pending_query is not None:
+            self.load_coffee_data(*self.pending_query[1:])
+        elif deleted_id is not None:
+            self.coffee_model.remove_row(deleted_id)
+        elif self.coffee_model.query is not None:
+            model = self.coffee_model
+            model.apply_row(coffee, model.source.matches(model.query, model.params, coffee.id))
+        self.refresh_summary()
+
+    def apply_bulk_change(self, changed_ids=(), deleted_ids=()):
+        model = self.coffee_model
+        if self.pending_query is not None or len(changed_ids) + len(deleted_ids) > self.INCREMENTAL_LIMIT:
+            self.load_coffee_data(*(self.pending_query[1:] if self.pending_query is not None
+                                    else (model.query, model.params, model.ranked)))
+        elif model.query is not None:
+            rows = self.repository.rows(changed_ids) if changed_ids else []
+            matching = model.source.matching_ids(model.query, model.params, changed_ids) if changed_ids else set()
+            model.apply_rows(rows, matching, deleted_ids)
+            self.refresh_summary()
+
+    def selected_ids(self):
+        return [self.coffee_model.row_data(index.row())[0]
+                for index in self.coffeeTable.selectionModel().selectedRows()]
+
+    def view_query(self):
+        model = self.coffee_model
+        if model.source is self.repository:
+            return model.query, model.params
+        return self.repository.filter_query(
+            self.searchInput.text(), self.roastFilter.currentText(), self.typeFilter.currentText())[:2]
+
+    def filter_selection(self):
+        return query_selection(*self.view_query())
+
+    def closeEvent(self, event):
+        self.search_timer.stop()
+        if self.repository is None:
+            super().closeEvent(event)
+            return
+        self.query_scheduler.shutdown()
+        self.fuzzy_scheduler.shutdown()
+        self.summary_scheduler.shutdown()
+        self.coffee_model.clear()
+        if self.catalog_cache is not None:
+            self.catalog_cache.close()
+        self.repository.close()
+        super().closeEvent(event)
 
     def add_coffee(self):
+        if self.repository is None:
+            return
         dialog = AddEditCoffeeForm(self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             data = dialog.get_data()
-            cursor = self.conn.cursor()
             try:
-                cursor.execute('''
-                    INSERT INTO coffee (name, roast_degree, ground_whole, taste_description, price, volume)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (data['name'], data['roast_degree'], data['ground_whole'],
-                      data['taste_description'], data['price'], data['volume']))
-                self.conn.commit()
-                self.load_coffee_data()
+                self.apply_change(self.repository.add(data))
                 QMessageBox.information(self, "Успех", "Кофе успешно добавлен")
             except sqlite3.IntegrityError:
                 QMessageBox.warning(self, "Ошибка", "Кофе с таким названием уже существует")
@@ -194,24 +431,21 @@ class CoffeeApp(QMainWindow, MainDesign):
                 QMessageBox.warning(self, "Ошибка", f"Произошла ошибка: {str(e)}")
 
     def edit_coffee(self):
-        selected = self.coffeeTable.currentRow()
-        if selected == -1:
+        selected = self.coffeeTable.currentIndex()
+        if not selected.isValid():
             QMessageBox.warning(self, "Ошибка", "Выберите кофе для редактирования")
             return
-        coffee_id = int(self.coffeeTable.item(selected, 0).text())
+        coffee_id = self.coffee_model.row_data(selected.row())[0]
         dialog = AddEditCoffeeForm(self, coffee_id)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             data = dialog.get_data()
-            cursor = self.conn.cursor()
             try:
-                cursor.execute('''
-                    UPDATE coffee 
-                    SET name=?, roast_degree=?, ground_whole=?, taste_description=?, price=?, volume=?
-                    WHERE id=?
-                ''', (data['name'], data['roast_degree'], data['ground_whole'],
-                      data['taste_description'], data['price'], data['volume'], coffee_id))
-                self.conn.commit()
-                self.load_coffee_data()
+                coffee = self.repository.update(coffee_id, data)
+                if coffee is None:
+                    self.apply_change(deleted_id=coffee_id)
+                    QMessageBox.warning(self, "Ошибка", "Позиция уже удалена")
+                    return
+                self.apply_change(coffee)
                 QMessageBox.information(self, "Успех", "Кофе успешно обновлен")
             except sqlite3.IntegrityError:
                 QMessageBox.warning(self, "Ошибка", "Кофе с таким названием уже существует")
@@ -219,28 +453,55 @@ class CoffeeApp(QMainWindow, MainDesign):
                 QMessageBox.warning(self, "Ошибка", f"Произошла ошибка: {str(e)}")
 
     def delete_coffee(self):
-        selected = self.coffeeTable.currentRow()
-        if selected == -1:
+        if self.repository is None:
+            return
+        coffee_ids = self.selected_ids()
+        if not coffee_ids:
             QMessageBox.warning(self, "Ошибка", "Выберите кофе для удаления")
             return
-        coffee_name = self.coffeeTable.item(selected, 1).text()
+        if len(coffee_ids) == 1:
+            coffee_name = self.coffee_model.row_data(self.coffee_model.find_row(coffee_ids[0]))[1]
+            question = f"Вы уверены, что хотите удалить '{coffee_name}'?"
+        else:
+            question = f"Вы уверены, что хотите удалить выбранные позиции ({len(coffee_ids)})?"
         reply = QMessageBox.question(
             self,
             "Подтверждение удаления",
-            f"Вы уверены, что хотите удалить '{coffee_name}'?",
+            question,
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
         if reply == QMessageBox.StandardButton.Yes:
-            coffee_id = int(self.coffeeTable.item(selected, 0).text())
-            cursor = self.conn.cursor()
             try:
-                cursor.execute('DELETE FROM coffee WHERE id=?', (coffee_id,))
-                self.conn.commit()
-                self.load_coffee_data()
-                QMessageBox.information(self, "Успех", "Кофе успешно удален")
+                deleted_ids = self.repository.delete_many(coffee_ids)
+                self.apply_bulk_change(deleted_ids=deleted_ids)
+                QMessageBox.information(self, "Успех", "Кофе успешно удален" if len(coffee_ids) == 1
+                                        else f"Удалено позиций: {len(deleted_ids)}")
             except Exception as e:
                 QMessageBox.warning(self, "Ошибка", f"Произошла ошибка: {str(e)}")
 
+    def bulk_edit(self):
+        if self.repository is None or self.coffee_model.query is None:
+            return
+        coffee_ids = self.selected_ids()
+        try:
+            filtered = self.repository.count(*self.filter_selection())
+        except Exception as e:
+            QMessageBox.warning(self, "Ошибка", f"Произошла ошибка: {str(e)}")
+            return
+        dialog = BulkEditForm(self, len(coffee_ids), filtered)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        changes = dialog.get_changes()
+        if not changes:
+            return
+        selection = id_selection(coffee_ids) if dialog.selectionRadio.isChecked() else self.filter_selection()
+        try:
+            changed_ids = self.repository.bulk_update(*selection, **changes)
+            self.apply_bulk_change(changed_ids=changed_ids)
+            QMessageBox.information(self, "Успех", f"Изменено позиций: {len(changed_ids)}")
+        except Exception as e:
+            QMessageBox.warning(self, "Ошибка", f"Произошла ошибка: {str(e)}")
+
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
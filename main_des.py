@@ -36,25 +36,11 @@ class MainDesign(object):
         self.typeFilter.addItem("")
         self.horizontalLayout.addWidget(self.typeFilter)
         self.verticalLayout.addLayout(self.horizontalLayout)
-        self.coffeeTable = QtWidgets.QTableWidget(parent=self.centralwidget)
+        self.coffeeTable = QtWidgets.QTableView(parent=self.centralwidget)
         self.coffeeTable.setAlternatingRowColors(True)
+        self.coffeeTable.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.coffeeTable.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
         self.coffeeTable.setObjectName("coffeeTable")
-        self.coffeeTable.setColumnCount(7)
-        self.coffeeTable.setRowCount(0)
-        item = QtWidgets.QTableWidgetItem()
-        self.coffeeTable.setHorizontalHeaderItem(0, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.coffeeTable.setHorizontalHeaderItem(1, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.coffeeTable.setHorizontalHeaderItem(2, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.coffeeTable.setHorizontalHeaderItem(3, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.coffeeTable.setHorizontalHeaderItem(4, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.coffeeTable.setHorizontalHeaderItem(5, item)
-        item = QtWidgets.QTableWidgetItem()
-        self.coffeeTable.setHorizontalHeaderItem(6, item)
         self.verticalLayout.addWidget(self.coffeeTable)
         MainWindow.setCentralWidget(self.centralwidget)
         self.statusbar = QtWidgets.QStatusBar(parent=MainWindow)
@@ -75,17 +61,3 @@ class MainDesign(object):
         self.typeFilter.setItemText(0, _translate("MainWindow", "Все"))
         self.typeFilter.setItemText(1, _translate("MainWindow", "В зернах"))
         self.typeFilter.setItemText(2, _translate("MainWindow", "Молотый"))
-        item = self.coffeeTable.horizontalHeaderItem(0)
-        item.setText(_translate("MainWindow", "ID"))
-        item = self.coffeeTable.horizontalHeaderItem(1)
-        item.setText(_translate("MainWindow", "Название"))
-        item = self.coffeeTable.horizontalHeaderItem(2)
-        item.setText(_translate("MainWindow", "Обжарка"))
-        item = self.coffeeTable.horizontalHeaderItem(3)
-        item.setText(_translate("MainWindow", "Тип"))
-        item = self.coffeeTable.horizontalHeaderItem(4)
-        item.setText(_translate("MainWindow", "Вкус"))
-        item = self.coffeeTable.horizontalHeaderItem(5)
-        item.setText(_translate("MainWindow", "Цена"))
-        item = self.coffeeTable.horizontalHeaderItem(6)
-        item.setText(_translate("MainWindow", "Объем"))
@@ -0,0 +1,48 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Onedir build: no self-extraction on launch, no UPX decompression, bytecode without docstrings/asserts.
+# pyinstaller main_onedir.spec
+import os
+
+
+a = Analysis(
+    [os.path.join(SPECPATH, 'main.py')],
+    pathex=[SPECPATH],
+    binaries=[],
+    datas=[],
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=['tkinter', 'unittest'],
+    noarchive=False,
+    optimize=2,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='main',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon=[os.path.join(SPECPATH, 'icon_desctop.ico')],
+)
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='main',
+)
@@ -0,0 +1,77 @@
+import threading
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class QueryWorker(QRunnable):
+    def __init__(self, scheduler, generation, job):
+        super().__init__()
+        self.scheduler = scheduler
+        self.generation = generation
+        self.job = job
+
+    def run(self):
+        repository = self.scheduler.repository
+        conn = repository.acquire_reader()
+        if not self.scheduler.register(self.generation, conn):
+            repository.release_reader(conn)
+            return
+        try:
+            rows = self.job(conn)
+        except Exception as e:
+            self.scheduler.failed.emit(self.generation, str(e))
+            return
+        finally:
+            self.scheduler.unregister(self.generation)
+            repository.release_reader(conn)
+        self.scheduler.finished.emit(self.generation, rows)
+
+
+class QueryScheduler(QObject):
+    finished = pyqtSignal(int, list)
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, repository, parent=None):
+        super().__init__(parent)
+        self.repository = repository
+        self.generation = 0
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+        self._lock = threading.Lock()
+        self._running = {}
+
+    def submit(self, query, params):
+        params = list(params)
+        return self.submit_job(lambda conn: self.repository.execute(conn, query, params))
+
+    def submit_job(self, job):
+        with self._lock:
+            self.generation += 1
+            for conn in self._running.values():
+                conn.interrupt()
+            generation = self.generation
+        self.pool.start(QueryWorker(self, generation, job))
+        return generation
+
+    def is_current(self, generation):
+        return generation == self.generation
+
+    def register(self, generation, conn):
+        with self._lock:
+            if generation != self.generation:
+                return False
+            self._running[generation] = conn
+            return True
+
+    def unregister(self, generation):
+        with self._lock:
+            self._running.pop(generation, None)
+
+    def cancel(self):
+        with self._lock:
+            self.generation += 1
+            for conn in self._running.values():
+                conn.interrupt()
+
+    def shutdown(self):
+        self.cancel()
+        self.pool.waitForDone()
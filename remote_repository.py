@@ -0,0 +1,149 @@
+import http.client
+import json
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import urlencode, urlsplit
+from repository import ALL, Coffee, fts_query
+from server import SORT_COLUMNS
+
+
+class RemoteError(Exception):
+    pass
+
+
+class RemoteConnection:
+    def __init__(self, host, port, timeout):
+        self.http = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def request(self, method, path, payload=None, headers=None):
+        body = None if payload is None else json.dumps(payload, ensure_ascii=False).encode()
+        headers = dict(headers or {})
+        if body is not None:
+            headers['Content-Type'] = 'application/json; charset=utf-8'
+        try:
+            self.http.request(method, path, body, headers)
+            response = self.http.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.http.close()
+            raise
+        result = json.loads(data) if data else None
+        if response.status == 409:
+            raise sqlite3.IntegrityError(result['error'])
+        if response.status >= 400 and response.status != 404:
+            raise RemoteError(f"{response.status}: {result['error'] if result else response.reason}")
+        return response.status, response.getheader('ETag'), result
+
+    def interrupt(self):
+        if self.http.sock is not None:
+            self.http.sock.close()
+
+    def close(self):
+        self.http.close()
+
+
+class RemoteRepository:
+    CACHE_SIZE = 256
+
+    def __init__(self, url, readers=2, timeout=10):
+        address = urlsplit(url)
+        self.host = address.hostname
+        self.port = address.port or 8765
+        self.timeout = timeout
+        self.conn = RemoteConnection(self.host, self.port, timeout)
+        self.profiler = None
+        self._readers = queue.LifoQueue()
+        self._reader_limit = readers
+        self._lock = threading.Lock()
+        self._etags = OrderedDict()
+
+    def set_profiler(self, profiler):
+        pass
+
+    def acquire_reader(self):
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            return RemoteConnection(self.host, self.port, self.timeout)
+
+    def release_reader(self, conn):
+        with self._lock:
+            if self._readers.qsize() < self._reader_limit:
+                self._readers.put(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def reader(self):
+        conn = self.acquire_reader()
+        try:
+            yield conn
+        finally:
+            self.release_reader(conn)
+
+    def filter_query(self, search_text='', roast_degree=ALL, ground_whole=ALL):
+        args = {'search': search_text, 'roast': roast_degree, 'type': ground_whole}
+        query = urlencode({name: value for name, value in args.items() if value and value != ALL})
+        return query, [], bool(fts_query(search_text))
+
+    def page_query(self, query, params, ranked, sort_column, descending, after, limit):
+        args = {'sort': 'rank' if ranked else SORT_COLUMNS[sort_column], 'desc': int(descending), 'limit': limit}
+        if after is not None:
+            args['after'] = json.dumps(list(after), ensure_ascii=False)
+        return f'/coffee?{"&".join(filter(None, (query, urlencode(args))))}', params
+
+    def execute(self, conn, query, params=(), fetch=None):
+        with self._lock:
+            cached = self._etags.get(query)
+        status, etag, result = conn.request('GET', query, headers={'If-None-Match': cached[0]} if cached else None)
+        if status == 304:
+            return cached[1]
+        rows = [tuple(row) for row in result['rows']]
+        if etag:
+            with self._lock:
+                self._etags[query] = (etag, rows)
+                self._etags.move_to_end(query)
+                if len(self._etags) > self.CACHE_SIZE:
+                    self._etags.popitem(last=False)
+        return rows
+
+    def fetch(self, query, params):
+        return self.execute(self.conn, query, params)
+
+    def matches(self, query, params, coffee_id):
+        path = f'/coffee?{"&".join(filter(None, (query, urlencode({"id": coffee_id, "limit": 1}))))}'
+        return bool(self.execute(self.conn, path))
+
+    def get(self, coffee_id):
+        status, _, result = self.conn.request('GET', f'/coffee/{coffee_id}')
+        return Coffee._make(result) if status == 200 else None
+
+    def add(self, data):
+        return Coffee._make(self.conn.request('POST', '/coffee', data)[2])
+
+    def update(self, coffee_id, data):
+        status, _, result = self.conn.request('PUT', f'/coffee/{coffee_id}', data)
+        return Coffee._make(result) if status == 200 else None
+
+    def delete(self, coffee_id):
+        return int(self.conn.request('DELETE', f'/coffee/{coffee_id}')[0] == 200)
+
+    def delete_many(self, ids):
+        return self.apply_batch(deleted=ids)[2]
+
+    def apply_batch(self, added=(), updated=(), deleted=()):
+        result = self.conn.request('POST', '/coffee/batch', {
+            'add': list(added),
+            'update': [dict(data, id=coffee_id) for coffee_id, data in updated],
+            'delete': list(deleted),
+        })[2]
+        return ([Coffee._make(row) for row in result['added']],
+                [Coffee._make(row) for row in result['updated']], result['deleted'])
+
+    def close(self):
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+        self.conn.close()
@@ -0,0 +1,282 @@
+import json
+import math
+import queue
+import re
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from operator import attrgetter, methodcaller
+from database import SUMMARY_AGGREGATES, SUMMARY_COLUMNS, connect, migrate, rebuild_summary
+
+
+Coffee = namedtuple('Coffee', 'id name roast_degree ground_whole taste_description price volume')
+Summary = namedtuple('Summary', SUMMARY_COLUMNS.replace(',', ''))
+
+SELECT_COLUMNS = 'coffee.id, coffee.name, roast_degree, ground_whole, coffee.taste_description, price, volume'
+SORT_EXPRESSIONS = (
+    'coffee.id', 'coffee.name', 'coffee.roast_degree', 'coffee.ground_whole',
+    "IFNULL(coffee.taste_description, '')", 'coffee.price', 'coffee.volume',
+)
+ALL = "Все"
+
+fetch_all = methodcaller('fetchall')
+fetch_one = methodcaller('fetchone')
+last_row_id = attrgetter('lastrowid')
+row_count = attrgetter('rowcount')
+
+
+def search_words(text):
+    return re.findall(r'\w+', text.casefold().replace('ё', 'е'))
+
+
+def fts_query(text):
+    return ' '.join(f'"{word}"*' for word in search_words(text))
+
+
+def same_summary(left, right):
+    return (left is not None and right is not None and left._replace(volume=0) == right._replace(volume=0)
+            and math.isclose(left.volume, right.volume, rel_tol=1e-9, abs_tol=1e-6))
+
+
+def id_selection(ids):
+    return 'SELECT value FROM json_each(?)', [json.dumps(list(ids))]
+
+
+def query_selection(query, params):
+    return f'SELECT id FROM ({query})', list(params)
+
+
+class CoffeeRepository:
+    STATEMENT_CACHE_SIZE = 256
+
+    def __init__(self, db_path, readers=2):
+        self.db_path = db_path
+        self.conn = connect(db_path, cached_statements=self.STATEMENT_CACHE_SIZE)
+        migrate(self.conn)
+        self._readers = queue.LifoQueue()
+        self._reader_limit = readers
+        self._lock = threading.Lock()
+        self.profiler = None
+
+    def set_profiler(self, profiler):
+        self.profiler = profiler
+        if profiler is None:
+            self.conn.set_trace_callback(None)
+        else:
+            profiler.attach(self.conn)
+
+    def acquire_reader(self):
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = connect(self.db_path, check_same_thread=False, cached_statements=self.STATEMENT_CACHE_SIZE)
+        if self.profiler is None:
+            conn.set_trace_callback(None)
+        else:
+            self.profiler.attach(conn)
+        return conn
+
+    def release_reader(self, conn):
+        with self._lock:
+            if self._readers.qsize() < self._reader_limit:
+                self._readers.put(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def reader(self):
+        conn = self.acquire_reader()
+        try:
+            yield conn
+        finally:
+            self.release_reader(conn)
+
+    def filter_query(self, search_text='', roast_degree=ALL, ground_whole=ALL):
+        return self.match_query(fts_query(search_text), roast_degree, ground_whole)
+
+    def match_query(self, match, roast_degree=ALL, ground_whole=ALL):
+        if match:
+            query = (f'SELECT {SELECT_COLUMNS}, coffee_fts.rank FROM coffee_fts '
+                     f'CROSS JOIN coffee ON coffee.id = coffee_fts.rowid WHERE coffee_fts MATCH ?')
+            params = [match]
+        else:
+            query = f'SELECT {SELECT_COLUMNS} FROM coffee WHERE 1=1'
+            params = []
+        if roast_degree != ALL:
+            query += ' AND roast_degree = ?'
+            params.append(roast_degree)
+        if ground_whole != ALL:
+            query += ' AND ground_whole = ?'
+            params.append(ground_whole)
+        return query, params, bool(match)
+
+    def page_query(self, query, params, ranked, sort_column, descending, after, limit):
+        if ranked:
+            if after is None:
+                return f'{query} ORDER BY coffee_fts.rank, coffee.id LIMIT ?', [*params, limit]
+            return (f'{query} AND (coffee_fts.rank, coffee.id) > (?, ?) ORDER BY coffee_fts.rank, coffee.id LIMIT ?',
+                    [*params, *after, limit])
+        expression = SORT_EXPRESSIONS[sort_column]
+        direction, beyond = ('DESC', '<') if descending else ('ASC', '>')
+        if after is None:
+            return (f'{query} ORDER BY {expression} {direction}, coffee.id {direction} LIMIT ?',
+                    [*params, limit])
+        value, coffee_id = after
+        if sort_column == 0:
+            return (f'{query} AND coffee.id {beyond} ? ORDER BY coffee.id {direction} LIMIT ?',
+                    [*params, coffee_id, limit])
+        return (f'SELECT * FROM ({query} AND {expression} = ? AND coffee.id {beyond} ? '
+                f'ORDER BY coffee.id {direction} LIMIT ?) '
+                f'UNION ALL '
+                f'SELECT * FROM ({query} AND {expression} {beyond} ? '
+                f'ORDER BY {expression} {direction}, coffee.id {direction} LIMIT ?) LIMIT ?',
+                [*params, value, coffee_id, limit, *params, value, limit, limit])
+
+    def execute(self, conn, query, params=(), fetch=fetch_all):
+        if self.profiler is None:
+            return fetch(conn.execute(query, params))
+        return self.profiler.run(conn, query, params, fetch)
+
+    def fetch(self, query, params):
+        return self.execute(self.conn, query, params)
+
+    def matches(self, query, params, coffee_id):
+        return self.execute(self.conn, f'{query} AND coffee.id = ?', [*params, coffee_id], fetch_one) is not None
+
+    def count(self, query, params):
+        return self.execute(self.conn, f'SELECT COUNT(*) FROM ({query})', params, fetch_one)[0]
+
+    def rows(self, ids):
+        selection, params = id_selection(ids)
+        return self.execute(self.conn, f'SELECT {SELECT_COLUMNS} FROM coffee WHERE id IN ({selection})', params)
+
+    def matching_ids(self, query, params, ids):
+        selection, selection_params = id_selection(ids)
+        return {row[0] for row in self.execute(
+            self.conn, f'SELECT id FROM ({query}) WHERE id IN ({selection})', [*params, *selection_params])}
+
+    def summary_query(self, roast_degree=ALL, ground_whole=ALL):
+        query = f'SELECT {SUMMARY_COLUMNS} FROM coffee_summary WHERE 1=1'
+        params = []
+        if roast_degree != ALL:
+            query += ' AND roast_degree = ?'
+            params.append(roast_degree)
+        if ground_whole != ALL:
+            query += ' AND ground_whole = ?'
+            params.append(ground_whole)
+        return f'{query} ORDER BY roast_degree, ground_whole', params
+
+    def grouped_summary_query(self, query, params):
+        return (f'SELECT roast_degree, ground_whole, {SUMMARY_AGGREGATES} FROM ({query}) '
+                f'GROUP BY roast_degree, ground_whole ORDER BY roast_degree, ground_whole', list(params))
+
+    def check_summary(self):
+        with self.reader() as conn:
+            conn.execute('BEGIN')
+            try:
+                stored = {row[:2]: Summary._make(row) for row in self.execute(conn, *self.summary_query())}
+                expected = {row[:2]: Summary._make(row) for row in self.execute(
+                    conn, *self.grouped_summary_query(*self.filter_query()[:2]))}
+            finally:
+                conn.rollback()
+        return [(category, stored.get(category), expected.get(category))
+                for category in sorted(stored.keys() | expected.keys())
+                if not same_summary(stored.get(category), expected.get(category))]
+
+    def rebuild_summary(self):
+        with self.conn:
+            rebuild_summary(self.conn.cursor())
+
+    def get(self, coffee_id):
+        row = self.execute(self.conn, f'SELECT {SELECT_COLUMNS} FROM coffee WHERE id = ?', (coffee_id,), fetch_one)
+        return Coffee._make(row) if row else None
+
+    def _insert(self, data):
+        return self.execute(self.conn, '''
+            INSERT INTO coffee (name, roast_degree, ground_whole, taste_description, price, volume)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (data['name'], data['roast_degree'], data['ground_whole'],
+              data['taste_description'], data['price'], data['volume']), last_row_id)
+
+    def _update(self, coffee_id, data):
+        return self.execute(self.conn, '''
+            UPDATE coffee
+            SET name=?, roast_degree=?, ground_whole=?, taste_description=?, price=?, volume=?
+            WHERE id=?
+        ''', (data['name'], data['roast_degree'], data['ground_whole'],
+              data['taste_description'], data['price'], data['volume'], coffee_id), row_count)
+
+    def _delete(self, coffee_id):
+        return self.execute(self.conn, 'DELETE FROM coffee WHERE id=?', (coffee_id,), row_count)
+
+    def add(self, data):
+        with self.conn:
+            coffee_id = self._insert(data)
+        return self.get(coffee_id)
+
+    def update(self, coffee_id, data):
+        with self.conn:
+            self._update(coffee_id, data)
+        return self.get(coffee_id)
+
+    def delete(self, coffee_id):
+        with self.conn:
+            return self._delete(coffee_id)
+
+    def delete_many(self, ids):
+        return self.bulk_delete(*id_selection(ids))
+
+    def bulk_delete(self, selection, params):
+        with self.conn:
+            return [row[0] for row in self.execute(
+                self.conn, f'DELETE FROM coffee WHERE id IN ({selection}) RETURNING id', params)]
+
+    def bulk_update(self, selection, params, roast_degree=None, ground_whole=None, price_factor=None, price_delta=None):
+        assignments = []
+        values = []
+        if roast_degree is not None:
+            assignments.append('roast_degree = ?')
+            values.append(roast_degree)
+        if ground_whole is not None:
+            assignments.append('ground_whole = ?')
+            values.append(ground_whole)
+        if price_factor is not None or price_delta is not None:
+            assignments.append('price = MAX(0, ROUND(price * ? + ?, 2))')
+            values += [1 if price_factor is None else price_factor, price_delta or 0]
+        if not assignments:
+            return []
+        with self.conn:
+            return [row[0] for row in self.execute(
+                self.conn, f'UPDATE coffee SET {", ".join(assignments)} WHERE id IN ({selection}) RETURNING id',
+                [*values, *params])]
+
+    def apply_batch(self, added=(), updated=(), deleted=()):
+        with self.conn:
+            added_ids = [self._insert(data) for data in added]
+            updated_ids = [coffee_id for coffee_id, data in updated if self._update(coffee_id, data)]
+            deleted_ids = [coffee_id for coffee_id in deleted if self._delete(coffee_id)]
+        return ([self.get(coffee_id) for coffee_id in added_ids],
+                [self.get(coffee_id) for coffee_id in updated_ids], deleted_ids)
+
+    def upsert_many(self, cursor, rows):
+        cursor.executemany('''
+            INSERT INTO coffee (name, roast_degree, ground_whole, taste_description, price, volume)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                roast_degree = excluded.roast_degree,
+                ground_whole = excluded.ground_whole,
+                taste_description = excluded.taste_description,
+                price = excluded.price,
+                volume = excluded.volume
+            WHERE roast_degree IS NOT excluded.roast_degree
+               OR ground_whole IS NOT excluded.ground_whole
+               OR taste_description IS NOT excluded.taste_description
+               OR price IS NOT excluded.price
+               OR volume IS NOT excluded.volume
+        ''', rows)
+
+    def close(self):
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+        self.conn.execute('PRAGMA optimize')
+        self.conn.close()
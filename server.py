@@ -0,0 +1,278 @@
+import argparse
+import asyncio
+import json
+import sqlite3
+import sys
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+from catalog_cli import to_row
+from database import COLUMNS, connect, default_db_path
+from repository import ALL, CoffeeRepository
+
+SORT_COLUMNS = ('id', *COLUMNS)
+PAGE_SIZE = 256
+MAX_PAGE_SIZE = 1000
+MAX_BODY = 16 * 1024 * 1024
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def to_data(record):
+    try:
+        return dict(zip(COLUMNS, to_row(record)))
+    except ValueError as e:
+        raise HttpError(HTTPStatus.BAD_REQUEST, str(e))
+
+
+def to_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"некорректный id: {value}")
+
+
+class CatalogServer:
+    def __init__(self, db_path, readers=4, cache_size=1024):
+        self.db_path = db_path
+        self.readers = readers
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.data_version = None
+        self.seq = None
+
+    async def start(self, host='127.0.0.1', port=8765):
+        loop = asyncio.get_running_loop()
+        self.writer = ThreadPoolExecutor(1, thread_name_prefix='catalog-writer')
+        self.reader = ThreadPoolExecutor(self.readers, thread_name_prefix='catalog-reader')
+        self.repository = await loop.run_in_executor(self.writer, CoffeeRepository, self.db_path, self.readers)
+        self.watch = connect(self.db_path)
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.watch.close()
+        self.reader.shutdown()
+        await asyncio.get_running_loop().run_in_executor(self.writer, self.repository.close)
+        self.writer.shutdown()
+
+    def version(self):
+        data_version = self.watch.execute('PRAGMA data_version').fetchone()[0]
+        if data_version != self.data_version:
+            self.data_version = data_version
+            seq = self.watch.execute('SELECT IFNULL(MAX(seq), 0) FROM coffee_changes').fetchone()[0]
+            if seq != self.seq:
+                self.seq = seq
+                self.cache.clear()
+        return self.seq
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, protocol = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY:
+                    writer.write(self.response(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': "слишком большой запрос"},
+                                               close=True))
+                    break
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = protocol == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                writer.write(await self.dispatch(method, target, headers, body, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, target, headers, body, keep_alive):
+        url = urlsplit(target)
+        parts = [part for part in url.path.split('/') if part]
+        try:
+            if parts[:1] != ['coffee'] or len(parts) > 2:
+                raise HttpError(HTTPStatus.NOT_FOUND, "нет такого ресурса")
+            if method == 'GET' and len(parts) == 1:
+                return await self.list_coffee(url.query, headers, keep_alive)
+            payload = json.loads(body) if body else None
+            if method == 'GET':
+                status, result = await self.write(self.get_coffee, to_id(parts[1]))
+            elif method == 'POST' and len(parts) == 1:
+                status, result = await self.write(self.add_coffee, to_data(payload))
+            elif method == 'POST' and parts[1] == 'batch':
+                status, result = await self.write(self.apply_batch, *self.parse_batch(payload))
+            elif method == 'PUT' and len(parts) == 2:
+                status, result = await self.write(self.update_coffee, to_id(parts[1]), to_data(payload))
+            elif method == 'DELETE' and len(parts) == 2:
+                status, result = await self.write(self.delete_coffee, to_id(parts[1]))
+            else:
+                raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, "метод не поддерживается")
+        except HttpError as e:
+            status, result = e.status, {'error': str(e)}
+        except json.JSONDecodeError as e:
+            status, result = HTTPStatus.BAD_REQUEST, {'error': f"некорректный JSON: {e}"}
+        except sqlite3.IntegrityError as e:
+            status, result = HTTPStatus.CONFLICT, {'error': str(e)}
+        except Exception as e:
+            status, result = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+        return self.response(status, result, close=not keep_alive)
+
+    async def list_coffee(self, query_string, headers, keep_alive):
+        args = dict(parse_qsl(query_string))
+        key = '&'.join(f'{name}={value}' for name, value in sorted(args.items()))
+        version = self.version()
+        etag = f'"{version}-{zlib.crc32(key.encode()):08x}"'
+        if headers.get('if-none-match') == etag:
+            return self.response(HTTPStatus.NOT_MODIFIED, None, etag=etag, close=not keep_alive)
+        body = self.cache.get(key)
+        if body is None:
+            try:
+                result = await self.query(args)
+            except HttpError as e:
+                return self.response(e.status, {'error': str(e)}, close=not keep_alive)
+            except sqlite3.Error as e:
+                return self.response(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}, close=not keep_alive)
+            body = json.dumps(result, ensure_ascii=False).encode()
+            if self.version() == version:
+                self.cache[key] = body
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(key)
+        return self.response(HTTPStatus.OK, body, etag=etag, close=not keep_alive)
+
+    async def query(self, args):
+        query, params, ranked = self.repository.filter_query(
+            args.get('search', ''), args.get('roast', ALL), args.get('type', ALL))
+        sort = args.get('sort', 'rank' if ranked else 'name')
+        try:
+            sort_column = None if sort == 'rank' else SORT_COLUMNS.index(sort)
+            limit = int(args.get('limit', PAGE_SIZE))
+            after = json.loads(args['after']) if 'after' in args else None
+        except (ValueError, json.JSONDecodeError):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "некорректные параметры sort, limit или after")
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"limit должен быть от 1 до {MAX_PAGE_SIZE}")
+        if after is not None and not (isinstance(after, list) and len(after) == 2
+                                      and isinstance(after[1], int) and not isinstance(after[0], (list, dict))):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "after должен быть списком [значение, id]")
+        if sort == 'rank' and not ranked:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "сортировка rank доступна только вместе с search")
+        ranked = sort == 'rank'
+        descending = args.get('desc', '0') == '1'
+        if 'id' in args:
+            query += ' AND coffee.id = ?'
+            params.append(to_id(args['id']))
+        query, params = self.repository.page_query(query, params, ranked, sort_column, descending, after, limit)
+        rows = await asyncio.get_running_loop().run_in_executor(self.reader, self.read, query, params)
+        following = None
+        if len(rows) == limit:
+            last = rows[-1]
+            value = last[-1] if ranked else last[sort_column]
+            following = ['' if value is None else value, last[0]]
+        return {'rows': rows, 'ranked': ranked, 'next': following}
+
+    def read(self, query, params):
+        with self.repository.reader() as conn:
+            return self.repository.execute(conn, query, params)
+
+    async def write(self, action, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.writer, action, *args)
+
+    def parse_batch(self, payload):
+        if not isinstance(payload, dict):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "ожидается объект с add, update и delete")
+        added = [to_data(record) for record in payload.get('add', [])]
+        updated = [(to_id(record.get('id') if isinstance(record, dict) else None), to_data(record))
+                   for record in payload.get('update', [])]
+        deleted = [to_id(coffee_id) for coffee_id in payload.get('delete', [])]
+        return added, updated, deleted
+
+    def get_coffee(self, coffee_id):
+        coffee = self.repository.get(coffee_id)
+        if coffee is None:
+            return HTTPStatus.NOT_FOUND, {'error': "кофе не найден"}
+        return HTTPStatus.OK, coffee
+
+    def add_coffee(self, data):
+        return HTTPStatus.CREATED, self.repository.add(data)
+
+    def update_coffee(self, coffee_id, data):
+        coffee = self.repository.update(coffee_id, data)
+        if coffee is None:
+            return HTTPStatus.NOT_FOUND, {'error': "кофе не найден"}
+        return HTTPStatus.OK, coffee
+
+    def delete_coffee(self, coffee_id):
+        if not self.repository.delete(coffee_id):
+            return HTTPStatus.NOT_FOUND, {'error': "кофе не найден"}
+        return HTTPStatus.OK, {'deleted': [coffee_id]}
+
+    def apply_batch(self, added, updated, deleted):
+        added, updated, deleted = self.repository.apply_batch(added, updated, deleted)
+        return HTTPStatus.OK, {'added': added, 'updated': updated, 'deleted': deleted}
+
+    @staticmethod
+    def response(status, result, etag=None, close=False):
+        if isinstance(result, bytes):
+            body = result
+        elif result is None:
+            body = b''
+        else:
+            body = json.dumps(result, ensure_ascii=False).encode()
+        head = [f'HTTP/1.1 {status.value} {status.phrase}']
+        if status != HTTPStatus.NOT_MODIFIED:
+            head += ['Content-Type: application/json; charset=utf-8', f'Content-Length: {len(body)}']
+        if etag:
+            head += [f'ETag: {etag}', 'Cache-Control: no-cache']
+        head.append('Connection: close' if close else 'Connection: keep-alive')
+        return ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body
+
+
+async def serve(args):
+    server = CatalogServer(args.db, args.readers, args.cache_size)
+    host, port = await server.start(args.host, args.port)
+    print(f"Сервер каталога: http://{host}:{port}/coffee", flush=True)
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP/JSON сервер кофейной карты для нескольких касс")
+    parser.add_argument('--db', default=None, help="путь к базе данных (по умолчанию data/coffee.sqlite)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--readers', type=int, default=4, help="число соединений для чтения")
+    parser.add_argument('--cache-size', type=int, default=1024, help="число кэшируемых ответов")
+    args = parser.parse_args(argv)
+    if args.db is None:
+        args.db = default_db_path()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+import pytest
+from repository import CoffeeRepository, id_selection, query_selection
+
+
+def record(name, roast_degree='Средняя', ground_whole='Молотый', price=1000.0, volume=250):
+    return {'name': name, 'roast_degree': roast_degree, 'ground_whole': ground_whole,
+            'taste_description': 'Шоколадный', 'price': price, 'volume': volume}
+
+
+@pytest.fixture
+def repository(tmp_path):
+    repository = CoffeeRepository(str(tmp_path / 'coffee.sqlite'))
+    yield repository
+    repository.close()
+
+
+def summary(repository, roast_degree, ground_whole):
+    rows = repository.fetch(*repository.summary_query(roast_degree, ground_whole))
+    return rows[0] if rows else None
+
+
+def test_initial_summary_matches(repository):
+    assert repository.check_summary() == []
+
+
+def test_check_detects_mismatch(repository):
+    repository.conn.execute("UPDATE coffee_summary SET count = count + 1 WHERE roast_degree = 'Средняя'")
+    repository.conn.commit()
+    assert repository.check_summary() != []
+    repository.rebuild_summary()
+    assert repository.check_summary() == []
+
+
+def test_inserts(repository):
+    repository.add(record('Новый 1', price=10.5))
+    repository.add(record('Новый 2', roast_degree='Светлая', price=99999.99, volume=1000))
+    repository.add(record('Новый 3', roast_degree='Экспериментальная', ground_whole='Капсулы'))
+    assert repository.check_summary() == []
+    assert summary(repository, 'Экспериментальная', 'Капсулы')[2] == 1
+
+
+def test_category_moving_updates(repository):
+    coffee = repository.add(record('Переезд', price=5.0))
+    repository.update(coffee.id, record('Переезд', roast_degree='Темная', ground_whole='В зернах', price=7.25))
+    assert repository.check_summary() == []
+    repository.update(coffee.id, record('Переезд', roast_degree='Новая', ground_whole='Новый', price=8.0, volume=100))
+    assert repository.check_summary() == []
+    repository.update(coffee.id, record('Переезд', roast_degree='Средняя', price=8.0, volume=500))
+    assert repository.check_summary() == []
+    assert summary(repository, 'Новая', 'Новый') is None
+
+
+def test_deleting_min_and_max_rows(repository):
+    cheapest = repository.add(record('Дешевый', price=1.0))
+    priciest = repository.add(record('Дорогой', price=50000.0))
+    assert summary(repository, 'Средняя', 'Молотый')[5:] == (1.0, 50000.0)
+    repository.delete(cheapest.id)
+    assert repository.check_summary() == []
+    repository.delete(priciest.id)
+    assert repository.check_summary() == []
+    assert summary(repository, 'Средняя', 'Молотый')[5:] == (820.0, 890.0)
+
+
+def test_deleting_last_row_of_category(repository):
+    coffee = repository.add(record('Один', roast_degree='Редкая'))
+    repository.delete(coffee.id)
+    assert repository.check_summary() == []
+    assert summary(repository, 'Редкая', 'Молотый') is None
+
+
+def test_bulk_update(repository):
+    ids = [repository.add(record(f'Пакет {number}', price=100.0 + number)).id for number in range(20)]
+    repository.bulk_update(*id_selection(ids[:10]), roast_degree='Светлая', price_factor=1.15)
+    assert repository.check_summary() == []
+    repository.bulk_update(*id_selection(ids[5:]), ground_whole='В зернах', price_delta=-150)
+    assert repository.check_summary() == []
+    query, params, _ = repository.filter_query('', 'Средняя')
+    repository.bulk_update(*query_selection(query, params), roast_degree='Темная')
+    assert repository.check_summary() == []
+    assert summary(repository, 'Средняя', 'Молотый') is None
+
+
+def test_bulk_delete(repository):
+    ids = [repository.add(record(f'Удаление {number}', price=10.0 * number)).id for number in range(1, 11)]
+    repository.delete_many(ids[:3])
+    assert repository.check_summary() == []
+    query, params, _ = repository.filter_query('шоколадный', 'Средняя', 'Молотый')
+    deleted = repository.bulk_delete(*query_selection(query, params))
+    assert len(deleted) == 9
+    assert repository.check_summary() == []